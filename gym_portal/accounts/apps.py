@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from accounts import sessions, signals  # noqa: F401 (sessions registers its periodic task)
+        post_migrate.connect(signals.create_role_groups, sender=self)
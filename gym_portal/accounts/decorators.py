@@ -0,0 +1,48 @@
+# gym_portal/accounts/decorators.py
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from .roles import CUSTOMER, TRAINER, resolve_role
+
+
+def _role_required(role, fallback):
+    def decorator_factory(view_func=None, message=None):
+        def reject(request):
+            if message:
+                messages.error(request, message)
+            return redirect(fallback)
+
+        def decorator(view):
+            if iscoroutinefunction(view):
+                @wraps(view)
+                async def _wrapped_async_view(request, *args, **kwargs):
+                    # The lazy request.role would hit the database from the
+                    # event loop, so resolve it up front and pin it
+                    user = await request.auser()
+                    request.user = user
+                    request.role = await sync_to_async(resolve_role)(user)
+                    if request.role != role:
+                        return reject(request)
+                    return await view(request, *args, **kwargs)
+                return _wrapped_async_view
+
+            @wraps(view)
+            def _wrapped_view(request, *args, **kwargs):
+                if request.role != role:
+                    return reject(request)
+                return view(request, *args, **kwargs)
+            return _wrapped_view
+
+        if view_func is not None:
+            return decorator(view_func)
+        return decorator
+    return decorator_factory
+
+
+# Usable bare (@trainer_required) or with a message (@trainer_required(message=...)),
+# on sync and async views alike
+trainer_required = _role_required(TRAINER, 'customer_dashboard')
+customer_required = _role_required(CUSTOMER, 'trainer_dashboard')
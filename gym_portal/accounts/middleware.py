@@ -0,0 +1,22 @@
+# gym_portal/accounts/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .roles import resolve_role
+
+
+class RoleMiddleware:
+    # Must come after AuthenticationMiddleware. The role is resolved lazily, so
+    # requests that never look at it don't touch the cache either. Async views
+    # can't evaluate it; the role decorators resolve it for them instead.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: resolve_role(request.user))
+        return self.get_response(request)
@@ -0,0 +1,45 @@
+# gym_portal/accounts/roles.py
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+TRAINER = 'trainer'
+CUSTOMER = 'customer'
+
+TRAINER_GROUP = 'Trainer'
+CUSTOMER_GROUP = 'Customer'
+
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+def role_cache_key(user_id):
+    return f'accounts:role:{user_id}'
+
+
+def resolve_role(user):
+    if not user.is_authenticated:
+        return None
+    key = role_cache_key(user.pk)
+    role = cache.get(key)
+    if role is None:
+        role = TRAINER if user.groups.filter(name=TRAINER_GROUP).exists() else CUSTOMER
+        cache.set(key, role, ROLE_CACHE_TIMEOUT)
+    return role
+
+
+def invalidate_roles(user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids])
+
+
+# Role group ids, looked up once per process. The groups themselves are
+# created by migrate (see accounts.signals.create_role_groups).
+_group_ids = {}
+
+
+def group_id(name):
+    if name not in _group_ids:
+        _group_ids[name] = Group.objects.get_or_create(name=name)[0].pk
+    return _group_ids[name]
+
+
+def forget_group_ids():
+    _group_ids.clear()
@@ -0,0 +1,16 @@
+# gym_portal/accounts/sessions.py
+from importlib import import_module
+
+from django.conf import settings
+
+from tasks.queue import task
+
+SESSION_CLEANUP_INTERVAL = 24 * 60 * 60
+
+
+# What `manage.py clearsessions` does, run daily by the task workers.
+# Expired rows are deleted from django_session; their cached copies in the
+# "sessions" cache expire on their own.
+@task(every=SESSION_CLEANUP_INTERVAL)
+def clear_expired_sessions():
+    import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
@@ -0,0 +1,41 @@
+# gym_portal/accounts/signals.py
+from django.contrib.auth.models import Group, User
+from django.db import router
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from .roles import CUSTOMER_GROUP, TRAINER_GROUP, forget_group_ids, invalidate_roles
+
+
+# Connected to post_migrate in AccountsConfig.ready(), so the role groups
+# exist before the first user does. Runs again after a test flush, which
+# recreates the groups under new ids.
+def create_role_groups(using, **kwargs):
+    if not router.allow_migrate_model(using, Group):
+        return
+    for name in (CUSTOMER_GROUP, TRAINER_GROUP):
+        Group.objects.using(using).get_or_create(name=name)
+    forget_group_ids()
+
+
+@receiver(post_delete, sender=Group)
+def forget_deleted_group(sender, instance, **kwargs):
+    forget_group_ids()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_role_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_roles([instance.pk])
+    elif pk_set:
+        invalidate_roles(pk_set)
+    elif isinstance(instance, Group):
+        # group.user_set.clear() doesn't report which users were removed
+        invalidate_roles(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_role_on_delete(sender, instance, **kwargs):
+    invalidate_roles([instance.pk])
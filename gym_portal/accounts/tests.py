@@ -1,3 +1,176 @@
-from django.test import TestCase
+import os
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gym.instrumentation import QueryBudgetTestMixin
+from . import sessions, throttling, urls
+
+
+class ViewQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('budget_member', password='budget-pass-123')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_accounts_view_has_a_budget(self):
+        for pattern in urls.urlpatterns:
+            self.assertIn(pattern.name, settings.VIEW_QUERY_BUDGETS)
+
+    def test_anonymous_pages(self):
+        for url_name in ('signup_customer', 'signup_trainer', 'login'):
+            with self.subTest(url_name):
+                self.assertWithinQueryBudget(self.client.get(reverse(url_name)))
+
+    def test_login(self):
+        response = self.client.post(reverse('login'), {'username': 'budget_member', 'password': 'budget-pass-123'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertWithinQueryBudget(response)
+
+    def test_signup(self):
+        response = self.client.post(reverse('signup_customer'), {
+            'username': 'budget_signup', 'first_name': 'New', 'last_name': 'Member',
+            'email': 'new@example.com', 'password1': 'a-long-pass-987', 'password2': 'a-long-pass-987',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertWithinQueryBudget(response)
+
+    def test_dashboard_and_logout(self):
+        self.client.force_login(self.customer)
+        self.assertWithinQueryBudget(self.client.get(reverse('dashboard')))
+        self.assertWithinQueryBudget(self.client.post(reverse('logout')))
+
+
+class SessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('session_member', password='session-pass-123')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_signed_in_pages_leave_the_session_table_alone(self):
+        response = self.client.post(reverse('login'), {'username': 'session_member', 'password': 'session-pass-123'})
+        self.assertTrue(Session.objects.exists())  # written through
+        # The welcome message travels in a cookie, not in the session
+        self.assertIn('messages', response.cookies)
+        for url_name in ('customer_dashboard', 'customer_profile_edit', 'customer_dashboard'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query for query in queries if 'django_session' in query['sql']], url_name)
+
+    def test_session_files_stay_out_of_the_checkout(self):
+        self.client.post(reverse('login'), {'username': 'session_member', 'password': 'session-pass-123'})
+        location = str(settings.CACHES['sessions']['LOCATION'])
+        self.assertFalse(location.startswith(str(settings.BASE_DIR)), location)
+        self.assertTrue(os.listdir(location))
+
+    def test_cleanup_deletes_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.create(session_key='expired-session', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='current-session', session_data='', expire_date=now + timedelta(days=1))
+        sessions.clear_expired_sessions()
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current-session'])
+
+
+# Counts go to a private in-memory cache: clearing the configured one would
+# wipe the live throttle state (files under cache/, or a Redis database)
+THROTTLE_TEST_CACHES = dict(settings.CACHES, throttle={
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'throttle-tests',
+})
+
+
+@override_settings(AUTH_THROTTLE_RATES={'login': {'ip': (5, 60), 'username': (2, 60)}, 'signup': {'ip': (1, 60)}},
+                   CACHES=THROTTLE_TEST_CACHES)
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        throttling.counts_cache().clear()
+        throttling.reset_blocked_counts()
+        # One fixed moment, so no attempt lands in the next window
+        clock = mock.patch('accounts.throttling.time', **{'time.return_value': 6000.0})
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def login(self, username, **extra):
+        return self.client.post(reverse('login'), {'username': username, 'password': 'wrong-pass'}, **extra)
+
+    def test_login_blocked_per_username_before_hashing(self):
+        self.assertEqual(self.login('target').status_code, 200)
+        self.assertEqual(self.login('Target ').status_code, 200)
+        with mock.patch('accounts.views.AuthenticationForm') as form:
+            response = self.login('target')
+        form.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Other usernames from the same address still get through
+        self.assertEqual(self.login('someone').status_code, 200)
+        self.assertEqual(throttling.blocked_counts(), {'login:username': 1})
+
+    def test_login_blocked_per_ip(self):
+        for index in range(5):
+            self.assertEqual(self.login(f'user{index}').status_code, 200)
+        self.assertEqual(self.login('user9').status_code, 429)
+        self.assertEqual(self.login('user9', REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.assertEqual(throttling.blocked_counts(), {'login:ip': 1})
+
+    def test_signup_and_pages_are_separate(self):
+        url = reverse('signup_trainer')
+        self.assertEqual(self.client.post(url, {}).status_code, 200)
+        self.assertEqual(self.client.post(url, {}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.login('member').status_code, 200)
+
+
+@override_settings(CACHES=THROTTLE_TEST_CACHES)
+class SlidingWindowTests(SimpleTestCase):
+
+    def setUp(self):
+        throttling.counts_cache().clear()
+
+    def limit(self, now):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        with override_settings(AUTH_THROTTLE_RATES={'test': {'ip': (4, 100)}}):
+            return throttling.limits_for('test', request, now=now)
+
+    def test_previous_window_fades_out(self):
+        for _ in range(4):
+            self.assertIsNone(throttling.check(self.limit(1050)))
+        self.assertIsNotNone(throttling.check(self.limit(1099)))
+        # A quarter into the next window, 3 of the 4 earlier hits still count
+        self.assertIsNone(throttling.check(self.limit(1125)))
+        self.assertIsNotNone(throttling.check(self.limit(1125)))
+        self.assertIsNone(throttling.check(self.limit(1180)))
+
+    def test_decided_on_the_incremented_count(self):
+        limits = self.limit(1050)
+        # Another process's attempts landed after any earlier read
+        throttling.counts_cache().set(limits[0].key, 3)
+        self.assertIsNone(throttling.check(limits))
+        self.assertIsNotNone(throttling.check(limits))
+        # The blocked attempt took its hit back
+        self.assertEqual(throttling.counts_cache().get(limits[0].key), 4)
+        self.assertIsNone(cache.get(limits[0].key))
+
+    def test_forwarded_address_needs_trusted_proxy(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4, 5.6.7.8')
+        self.assertEqual(throttling.client_ip(request), '10.0.0.1')
+        with override_settings(AUTH_THROTTLE_PROXIES=1):
+            self.assertEqual(throttling.client_ip(request), '5.6.7.8')
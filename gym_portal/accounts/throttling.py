@@ -0,0 +1,145 @@
+# gym_portal/accounts/throttling.py
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+IP = 'ip'
+USERNAME = 'username'
+
+_blocked = Counter()
+_blocked_lock = threading.Lock()
+
+
+def client_ip(request):
+    # With AUTH_THROTTLE_PROXIES proxies in front, each appends the address it
+    # got the request from; the one the nearest trusted proxy saw is real
+    proxies = getattr(settings, 'AUTH_THROTTLE_PROXIES', 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def counts_cache():
+    return caches[settings.AUTH_THROTTLE_CACHE]
+
+
+def _cache_key(scope, kind, value, window):
+    # Hashed, as usernames may hold characters some cache backends reject
+    digest = hashlib.blake2b(value.encode(), digest_size=12).hexdigest()
+    return f'accounts:throttle:{scope}:{kind}:{digest}:{window}'
+
+
+class Limit:
+    # Sliding-window counter: the count of the current fixed window plus the
+    # previous window's count weighted by how much of it the sliding window
+    # still overlaps. Two cache entries per client instead of a timestamp log.
+    def __init__(self, scope, kind, value, limit, period, now):
+        self.limit = limit
+        self.period = period
+        window, offset = divmod(now, period)
+        self.overlap = 1 - offset / period
+        self.retry_after = max(1, math.ceil(period - offset))
+        self.key = _cache_key(scope, kind, value, int(window))
+        self.previous_key = _cache_key(scope, kind, value, int(window) - 1)
+        self.kind = kind
+
+    def estimate(self, previous_counts, count):
+        return previous_counts.get(self.previous_key, 0) * self.overlap + count
+
+    def hit(self):
+        # add() then incr() stays atomic on shared backends, so the value
+        # returned is this attempt's own place in the window. A window's
+        # entry outlives it by one period so the next window can weigh it.
+        counts = counts_cache()
+        counts.add(self.key, 0, self.period * 2)
+        try:
+            return counts.incr(self.key)
+        except ValueError:  # evicted in between
+            counts.set(self.key, 1, self.period * 2)
+            return 1
+
+    def undo(self):
+        try:
+            counts_cache().decr(self.key)
+        except ValueError:
+            pass
+
+
+def limits_for(scope, request, username_field=None, now=None):
+    rates = settings.AUTH_THROTTLE_RATES.get(scope, {})
+    now = time.time() if now is None else now
+    values = {IP: client_ip(request)}
+    if username_field:
+        username = request.POST.get(username_field, '').strip().lower()
+        if username:
+            values[USERNAME] = username
+    return [
+        Limit(scope, kind, values[kind], limit, period, now)
+        for kind, (limit, period) in rates.items() if values.get(kind)
+    ]
+
+
+def check(limits):
+    # The first limit the attempt goes over, if any. Each limit is decided on
+    # the count its own increment returned, so parallel attempts can't all
+    # pass on an earlier read; a blocked attempt takes its hits back.
+    previous_counts = counts_cache().get_many([limit.previous_key for limit in limits])
+    for index, limit in enumerate(limits):
+        if limit.estimate(previous_counts, limit.hit()) > limit.limit:
+            for taken in limits[:index + 1]:
+                taken.undo()
+            return limit
+    return None
+
+
+def record_blocked(scope, kind):
+    with _blocked_lock:
+        _blocked[f'{scope}:{kind}'] += 1
+
+
+def blocked_counts():
+    # Per process, like gym.instrumentation.registry
+    with _blocked_lock:
+        return dict(sorted(_blocked.items()))
+
+
+def reset_blocked_counts():
+    with _blocked_lock:
+        _blocked.clear()
+
+
+# Limits POSTs to a view per client IP, and per username when
+# `username_field` names the form field holding it, at the rates in
+# AUTH_THROTTLE_RATES[scope]. Over the limit the view isn't called at all,
+# so no password gets hashed; the client gets a 429 with Retry-After.
+def throttle(scope, username_field=None):
+    def decorator(view):
+        @wraps(view)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+            exceeded = check(limits_for(scope, request, username_field))
+            if exceeded is None:
+                return view(request, *args, **kwargs)
+
+            record_blocked(scope, exceeded.kind)
+            logger.info('Throttled %s attempt from %s (%s limit)', scope, client_ip(request), exceeded.kind)
+            response = render(request, 'accounts/throttled.html', {
+                'retry_minutes': math.ceil(exceeded.retry_after / 60),
+            }, status=429)
+            response['Retry-After'] = exceeded.retry_after
+            return response
+        return _wrapped_view
+    return decorator
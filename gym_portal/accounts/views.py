@@ -2,19 +2,21 @@
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import User
 from django.shortcuts import redirect, render
 from django.contrib.auth.forms import AuthenticationForm
 from .forms import CustomerSignUpForm, TrainerSignUpForm
+from .roles import CUSTOMER_GROUP, TRAINER, TRAINER_GROUP, group_id
+from .throttling import throttle
 
 
+@throttle('signup')
 def signup_customer(request):
     if request.method == 'POST':
         form = CustomerSignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
-            customer_group, _ = Group.objects.get_or_create(name='Customer')
-            user.groups.add(customer_group)
+            user.groups.add(group_id(CUSTOMER_GROUP))
             messages.success(request, f'Welcome {user.first_name}! Your account has been created. Please log in.')
             return redirect('login')
     else:
@@ -22,13 +24,13 @@ def signup_customer(request):
     return render(request, 'accounts/signup_customer.html', {'form': form})
 
 
+@throttle('signup')
 def signup_trainer(request):
     if request.method == 'POST':
         form = TrainerSignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
-            trainer_group, _ = Group.objects.get_or_create(name='Trainer')
-            user.groups.add(trainer_group)
+            user.groups.add(group_id(TRAINER_GROUP))
             messages.success(request,
                              f'Welcome Trainer {user.first_name}! Your account has been created. Please log in.')
             return redirect('login')
@@ -37,6 +39,7 @@ def signup_trainer(request):
     return render(request, 'accounts/signup_trainer.html', {'form': form})
 
 
+@throttle('login', username_field='username')
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
@@ -63,7 +66,7 @@ def logout_view(request):
 
 @login_required
 def dashboard_redirect(request):
-    if request.user.groups.filter(name='Trainer').exists():
+    if request.role == TRAINER:
         return redirect('trainer_dashboard')
     else:
         return redirect('customer_dashboard')
@@ -1,11 +1,12 @@
 # gym_portal/gym/admin.py
 from django.contrib import admin
-from .models import CustomerProfile, DietPlan, WorkoutPlan, ProgressTracking
+from .models import CustomerProfile, DietPlan, WorkoutPlan, ProgressArchive, ProgressTracking
 
 @admin.register(CustomerProfile)
 class CustomerProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'age', 'height_cm', 'weight_kg', 'goal', 'bmi')
-    list_filter = ('goal', 'activity_level')
+    list_display = ('user', 'age', 'height_cm', 'weight_kg', 'goal', 'bmi', 'bmi_category')
+    list_filter = ('goal', 'activity_level', 'bmi_category')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
 
 @admin.register(DietPlan)
@@ -24,3 +25,10 @@ class ProgressTrackingAdmin(admin.ModelAdmin):
     list_display = ('customer', 'weight_kg', 'date')
     list_filter = ('date',)
     search_fields = ('customer__username',)
+
+@admin.register(ProgressArchive)
+class ProgressArchiveAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'week_start', 'samples', 'weight_kg', 'weight_min_kg', 'weight_max_kg')
+    list_filter = ('week_start',)
+    list_select_related = ('customer',)
+    search_fields = ('customer__username',)
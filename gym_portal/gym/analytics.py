@@ -0,0 +1,202 @@
+# gym_portal/gym/analytics.py
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .archive import weight_points, weight_rows
+from .models import CustomerProfile
+
+TREND_WINDOW_DAYS = 90
+MOVING_AVERAGE_DAYS = 7
+PLATEAU_DAYS = 21
+PLATEAU_KG_PER_WEEK = 0.1
+MAINTAIN_TOLERANCE_KG_PER_WEEK = 0.25
+PROJECTION_WEEKS = 4
+# Theil-Sen looks at every pair of points, so cap the input size
+ROBUST_MAX_POINTS = 200
+
+# Expected direction of weight change for each goal; None means weight is
+# not what the goal is judged on.
+GOAL_DIRECTION = {
+    'lose_weight': -1,
+    'gain_muscle': 1,
+    'maintain': 0,
+    'endurance': None,
+    'strength': None,
+}
+
+
+def _to_arrays(rows):
+    # rows: (customer_id, date, weight_kg) ordered by customer and date
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+    customer_ids, dates, weights = zip(*rows)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    return np.array(customer_ids, dtype=np.int64), days, np.array(weights, dtype=np.float64)
+
+
+def load_series(customers=Q(), since=None):
+    # Hot records and archived weekly means alike; see gym.archive
+    return _to_arrays(weight_rows(customers, since))
+
+
+def moving_average(days, weights, window_days=MOVING_AVERAGE_DAYS):
+    # Trailing mean over a calendar window (not a fixed number of samples),
+    # so irregular weigh-ins are handled correctly.
+    if not len(days):
+        return weights
+    start = np.searchsorted(days, days - (window_days - 1), side='left')
+    cumulative = np.concatenate(([0.0], np.cumsum(weights)))
+    end = np.arange(1, len(weights) + 1)
+    return (cumulative[end] - cumulative[start]) / (end - start)
+
+
+def linear_fit(days, weights):
+    if len(days) < 2 or days[-1] == days[0]:
+        return None
+    slope, intercept = np.polyfit(days - days[0], weights, 1)
+    return slope, intercept + slope * -days[0]
+
+
+def theil_sen_slope(days, weights):
+    days, weights = days[-ROBUST_MAX_POINTS:], weights[-ROBUST_MAX_POINTS:]
+    i, j = np.triu_indices(len(days), k=1)
+    dx = days[j] - days[i]
+    valid = dx != 0
+    if not valid.any():
+        return None
+    return float(np.median((weights[j] - weights[i])[valid] / dx[valid]))
+
+
+def _slopes(n, sx, sy, sxy, sxx):
+    # Ordinary least squares slope per customer from their sums, so every
+    # customer is fitted at once without a Python loop
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (n * sxy - sx * sy) / denominator
+    slopes[(n < 2) | (denominator == 0)] = np.nan
+    return slopes
+
+
+def _customer_sums(customers, since):
+    # Per customer, ordered by id: the least-squares sums n, Σx, Σy, Σxy, Σx²
+    # over the window, then the same over their last PLATEAU_DAYS. x counts
+    # days from `since`, which keeps the sums small.
+    points = weight_points(customers, since)
+    query, params = points.query.get_compiler(points.db).as_sql()
+    columns = ', '.join(
+        f'SUM({weight}), SUM({weight} * x), SUM({weight} * weight_kg), '
+        f'SUM({weight} * x * weight_kg), SUM({weight} * x * x)'
+        for weight in ('1', 'recent')
+    )
+    with connections[points.db].cursor() as cursor:
+        cursor.execute(
+            f'SELECT customer_id, {columns} FROM ('
+            f'SELECT customer_id, day - %s AS x, weight_kg, '
+            f'CASE WHEN day >= MAX(day) OVER (PARTITION BY customer_id) - %s THEN 1 ELSE 0 END AS recent '
+            f'FROM ({query}) points) marked GROUP BY customer_id ORDER BY customer_id',
+            [since.toordinal(), PLATEAU_DAYS, *params],
+        )
+        return cursor.fetchall()
+
+
+def _deviation(direction, weekly_rate, plateau):
+    # How far the trend is from what the goal expects, in kg/week
+    if direction is None or weekly_rate is None:
+        return 0.0
+    if direction == 0:
+        return max(0.0, abs(weekly_rate) - MAINTAIN_TOLERANCE_KG_PER_WEEK)
+    deviation = max(0.0, -direction * weekly_rate)
+    if plateau:
+        deviation += PLATEAU_KG_PER_WEEK
+    return deviation
+
+
+def _plateaued(days, weights):
+    recent = days >= days[-1] - PLATEAU_DAYS
+    if recent.sum() < 3:
+        return False
+    fit = linear_fit(days[recent], weights[recent])
+    return fit is not None and bool(abs(fit[0] * 7) < PLATEAU_KG_PER_WEEK)
+
+
+def customer_trend(customer, window_days=TREND_WINDOW_DAYS):
+    since = timezone.localdate() - timedelta(days=window_days)
+    _, days, weights = load_series(Q(customer=customer), since=since)
+    if len(days) < 2:
+        return None
+
+    fit = linear_fit(days, weights)
+    robust = theil_sen_slope(days, weights)
+    averages = moving_average(days, weights)
+    weekly_rate = float(fit[0]) * 7 if fit else None
+    plateau = _plateaued(days, weights)
+    profile = getattr(customer, 'customer_profile', None)
+    direction = GOAL_DIRECTION.get(profile.goal) if profile else None
+    deviation = _deviation(direction, weekly_rate, plateau)
+
+    projected = None
+    if fit:
+        slope, intercept = fit
+        projected = round(float(intercept + slope * (days[-1] + PROJECTION_WEEKS * 7)), 1)
+
+    return {
+        'samples': len(days),
+        'latest_weight': float(weights[-1]),
+        'moving_average': round(float(averages[-1]), 1),
+        'weekly_rate': round(weekly_rate, 2) if weekly_rate is not None else None,
+        'robust_weekly_rate': round(robust * 7, 2) if robust is not None else None,
+        'projected_weight': projected,
+        'projection_weeks': PROJECTION_WEEKS,
+        'plateau': plateau,
+        'off_track': deviation > 0,
+    }
+
+
+# Scores every customer matching `customers` (a Q over the progress
+# records' customer) against their goal in one pass and returns the
+# off-track ones, worst first.
+def score_customers(customers=Q(), window_days=TREND_WINDOW_DAYS):
+    since = timezone.localdate() - timedelta(days=window_days)
+    sums = _customer_sums(customers, since)
+    if not sums:
+        return []
+
+    sums = np.array(sums, dtype=np.float64)
+    unique_ids = sums[:, 0].astype(np.int64)
+    weekly_rates = _slopes(*sums[:, 1:6].T) * 7
+    recent_counts = sums[:, 6]
+    recent_rates = _slopes(*sums[:, 6:11].T) * 7
+    plateaus = (recent_counts >= 3) & (np.abs(recent_rates) < PLATEAU_KG_PER_WEEK)
+
+    goals = dict(CustomerProfile.objects.filter(user_id__in=unique_ids.tolist()).values_list('user_id', 'goal'))
+    directions = np.array([
+        np.nan if GOAL_DIRECTION.get(goals.get(customer_id)) is None else GOAL_DIRECTION[goals[customer_id]]
+        for customer_id in unique_ids.tolist()
+    ])
+
+    # Vectorised form of _deviation()
+    rates = np.nan_to_num(weekly_rates)
+    with np.errstate(invalid='ignore'):
+        scores = np.where(
+            directions == 0,
+            np.maximum(0.0, np.abs(rates) - MAINTAIN_TOLERANCE_KG_PER_WEEK),
+            np.maximum(0.0, -directions * rates) + plateaus * PLATEAU_KG_PER_WEEK,
+        )
+    scores[np.isnan(directions) | np.isnan(weekly_rates)] = 0.0
+
+    results = [
+        {
+            'customer_id': int(unique_ids[index]),
+            'weekly_rate': round(float(weekly_rates[index]), 2),
+            'plateau': bool(plateaus[index]),
+            'score': round(float(scores[index]), 3),
+        }
+        for index in np.argsort(-scores, kind='stable')
+        if scores[index] > 0
+    ]
+    return results
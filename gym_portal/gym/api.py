@@ -0,0 +1,233 @@
+# gym_portal/gym/api.py
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from accounts.roles import CUSTOMER
+from .models import DietPlan, ProgressTracking, WorkoutPlan
+from .pagination import keyset_paginate
+
+API_VERSION = 'v1'
+PROGRESS_PAGE_SIZE = 50
+MAX_PROGRESS_PAGE_SIZE = 200
+
+USER_FIELDS = ('username', 'first_name', 'last_name', 'email')
+PROFILE_FIELDS = USER_FIELDS + (
+    'age', 'height_cm', 'weight_kg', 'bmi', 'bmi_category', 'goal', 'activity_level',
+    'diseases', 'phone', 'emergency_contact', 'updated_at',
+)
+PLAN_FIELDS = ('id', 'title', 'description', 'trainer', 'created_at', 'updated_at')
+DIET_PLAN_FIELDS = PLAN_FIELDS + (
+    'breakfast', 'lunch', 'dinner', 'snacks', 'water_intake', 'supplements', 'notes',
+    'calories_target', 'protein_target',
+)
+WORKOUT_PLAN_FIELDS = PLAN_FIELDS + (
+    'duration_weeks', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+)
+PLAN_API_FIELDS = tuple(dict.fromkeys(DIET_PLAN_FIELDS + WORKOUT_PLAN_FIELDS))
+PROGRESS_FIELDS = ('id', 'date', 'weight_kg', 'notes', 'photo', 'updated_at')
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+# For API views: JSON errors instead of the HTML redirects that
+# login_required and customer_required answer with
+def api_view(view):
+    @wraps(view)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = error('Method not allowed.', 405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        if not request.user.is_authenticated:
+            return error('Authentication required.', 401)
+        if request.role != CUSTOMER:
+            return error('Only members have this API.', 403)
+        try:
+            response = view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return error(str(exc), 400)
+        response['Vary'] = 'Cookie'
+        return response
+    return _wrapped_view
+
+
+def requested_fields(request, available):
+    # Sparse fieldsets: ?fields=date,weight_kg
+    value = request.GET.get('fields')
+    if not value:
+        return available
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(available)}.')
+    return fields
+
+
+def _etag(*parts):
+    digest = hashlib.blake2b(repr((API_VERSION,) + parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+# Answers a conditional GET from `state`, the cheap aggregate describing the
+# data behind the response, before `build` serializes anything. Identical
+# state and query string means an identical body, so the ETag is strong.
+def conditional_json(request, state, last_modified, build):
+    etag = _etag(request.path, sorted(request.GET.lists()), state)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _changes(queryset):
+    # (newest updated_at, row count): the count catches deletions
+    totals = queryset.aggregate(changed=Max('updated_at'), rows=Count('id'))
+    return totals['changed'], totals['rows']
+
+
+def _plan_state(model, customer):
+    # Per plan, as the body names each plan's trainer and renaming a trainer
+    # touches no plan; a member has a handful of plans
+    return tuple(model.objects.filter(customer=customer).order_by('id').values_list(
+        'id', 'updated_at', 'trainer__username', 'trainer__first_name', 'trainer__last_name',
+    ))
+
+
+def _model_fields(model, fields):
+    # Columns to load for the requested fields; 'trainer' is a relation
+    concrete = {field.name for field in model._meta.concrete_fields}
+    return [name for name in fields if name in concrete]
+
+
+def _trainer_name(trainer):
+    if trainer is None:
+        return None
+    return trainer.get_full_name() or trainer.username
+
+
+def serialize_plan(plan, fields):
+    return {
+        name: _trainer_name(plan.trainer) if name == 'trainer' else getattr(plan, name)
+        for name in fields
+    }
+
+
+def serialize_progress(record, fields, request):
+    data = {}
+    for name in fields:
+        if name == 'photo':
+            data[name] = {
+                size: request.build_absolute_uri(url) for size, url in (
+                    ('thumb', record.thumb_jpg_url), ('medium', record.medium_jpg_url),
+                )
+            } if record.photo else None
+        else:
+            data[name] = getattr(record, name)
+    return data
+
+
+@api_view
+def profile(request):
+    user = request.user
+    fields = requested_fields(request, PROFILE_FIELDS)
+    customer_profile = user.customer_profile
+    user_state = tuple(getattr(user, name) for name in USER_FIELDS)
+
+    def build():
+        return {
+            name: getattr(user if name in USER_FIELDS else customer_profile, name)
+            for name in fields
+        }
+    # The user row was already loaded by AuthenticationMiddleware. No
+    # Last-Modified: the body includes user fields, which have no change time
+    state = (customer_profile.updated_at, user_state)
+    return conditional_json(request, state, None, build)
+
+
+def _plan_query(model, customer, fields):
+    columns = _model_fields(model, fields)
+    queryset = model.objects.filter(customer=customer, is_active=True).only('id', *columns)
+    if 'trainer' in fields:
+        queryset = queryset.select_related('trainer').only(
+            'id', *columns, 'trainer__username', 'trainer__first_name', 'trainer__last_name'
+        )
+    return queryset
+
+
+@api_view
+def active_plans(request):
+    user = request.user
+    # One fieldset for both plan types; a name need only exist on one of them
+    names = requested_fields(request, PLAN_API_FIELDS)
+    diet_fields = tuple(name for name in names if name in DIET_PLAN_FIELDS)
+    workout_fields = tuple(name for name in names if name in WORKOUT_PLAN_FIELDS)
+
+    # Inactive plans count too: deactivating one changes what is listed
+    diet_state = _plan_state(DietPlan, user)
+    workout_state = _plan_state(WorkoutPlan, user)
+
+    def build():
+        return {
+            'diet_plans': [serialize_plan(plan, diet_fields)
+                           for plan in _plan_query(DietPlan, user, diet_fields)],
+            'workout_plans': [serialize_plan(plan, workout_fields)
+                              for plan in _plan_query(WorkoutPlan, user, workout_fields)],
+        }
+    # No Last-Modified: deleting a plan changes the body but no timestamp
+    return conditional_json(request, (diet_state, workout_state), None, build)
+
+
+def _page_size(request):
+    value = request.GET.get('limit', '')
+    if not value:
+        return PROGRESS_PAGE_SIZE
+    if not value.isdigit() or not 0 < int(value) <= MAX_PROGRESS_PAGE_SIZE:
+        raise BadRequest(f'limit must be between 1 and {MAX_PROGRESS_PAGE_SIZE}.')
+    return int(value)
+
+
+def _page_link(request, **cursor):
+    params = {key: value for key, value in request.GET.items() if key not in ('after', 'before')}
+    params.update(cursor)
+    return request.build_absolute_uri(f'{request.path}?{urlencode(params)}')
+
+
+@api_view
+def progress(request):
+    user = request.user
+    fields = requested_fields(request, PROGRESS_FIELDS)
+    page_size = _page_size(request)
+    changed, rows = _changes(ProgressTracking.objects.filter(customer=user))
+
+    def build():
+        columns = set(_model_fields(ProgressTracking, fields)) | {'id', 'date'}
+        if 'photo' in fields:
+            columns.add('photo_processed')
+        page = keyset_paginate(
+            ProgressTracking.objects.filter(customer=user).only(*columns), ('date', 'id'), page_size,
+            after=request.GET.get('after'), before=request.GET.get('before'), descending=True,
+        )
+        return {
+            'results': [serialize_progress(record, fields, request) for record in page],
+            'next': _page_link(request, after=page.next_cursor) if page.has_next else None,
+            'previous': _page_link(request, before=page.previous_cursor) if page.has_previous else None,
+        }
+    # Deleting a record changes the page without moving max(updated_at)
+    return conditional_json(request, (changed, rows), None, build)
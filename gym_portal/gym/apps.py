@@ -6,4 +6,6 @@ class GymConfig(AppConfig):
     name = 'gym'
 
     def ready(self):
+        import gym.database
+        import gym.instrumentation
         import gym.signals
@@ -0,0 +1,174 @@
+# gym_portal/gym/archive.py
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField, Func, Q
+from django.utils import timezone
+
+from .models import ProgressArchive, ProgressTracking
+
+ARCHIVE_CUSTOMERS_PER_BATCH = 200
+# Keeps `pk__in` below SQLite's bound-parameter limit
+DELETE_CHUNK_SIZE = 500
+
+
+# Records dated before the Monday on or before the horizon are archived, so
+# a week always leaves the hot table whole. Nothing on or after this day is
+# ever archived, which lets readers whose window starts there skip the
+# archive without asking it.
+def archive_cutoff(today=None):
+    horizon = (today or timezone.localdate()) - timedelta(days=settings.PROGRESS_HOT_DAYS)
+    return horizon - timedelta(days=horizon.weekday())
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _archivable(cutoff):
+    # Records with a photo stay hot: the photo is what makes them worth keeping
+    return ProgressTracking.objects.filter(date__lt=cutoff).filter(Q(photo='') | Q(photo__isnull=True))
+
+
+def _summarise(rows):
+    # {(customer_id, week_start): [samples, weight total, min, max, day ordinal total]}
+    weeks = {}
+    for _, customer_id, day, weight in rows:
+        key = (customer_id, week_start(day))
+        week = weeks.get(key)
+        if week is None:
+            weeks[key] = [1, weight, weight, weight, day.toordinal()]
+        else:
+            week[0] += 1
+            week[1] += weight
+            week[2] = min(week[2], weight)
+            week[3] = max(week[3], weight)
+            week[4] += day.toordinal()
+    return weeks
+
+
+def _apply(summary, week):
+    samples, total, low, high, days = week
+    summary.samples = samples
+    summary.weight_kg = total / samples
+    summary.weight_min_kg = low
+    summary.weight_max_kg = high
+    summary.date = date.fromordinal(round(days / samples))
+
+
+def _store_weeks(customer_ids, weeks):
+    # Weeks archived by an earlier run (a back-dated import, say) are merged
+    existing = ProgressArchive.objects.select_for_update().filter(
+        customer_id__in=customer_ids, week_start__in={start for _, start in weeks},
+    )
+    updated = []
+    for summary in existing:
+        week = weeks.pop((summary.customer_id, summary.week_start), None)
+        if week is None:
+            continue
+        samples = summary.samples
+        week[0] += samples
+        week[1] += summary.weight_kg * samples
+        week[2] = min(week[2], summary.weight_min_kg)
+        week[3] = max(week[3], summary.weight_max_kg)
+        week[4] += summary.date.toordinal() * samples
+        _apply(summary, week)
+        updated.append(summary)
+    ProgressArchive.objects.bulk_update(
+        updated, ['samples', 'weight_kg', 'weight_min_kg', 'weight_max_kg', 'date'],
+    )
+
+    created = []
+    for (customer_id, start), week in weeks.items():
+        summary = ProgressArchive(customer_id=customer_id, week_start=start)
+        _apply(summary, week)
+        created.append(summary)
+    ProgressArchive.objects.bulk_create(created)
+    return len(updated) + len(created)
+
+
+# Moves progress records dated before `cutoff` (default archive_cutoff())
+# into weekly ProgressArchive summaries, a batch of customers per
+# transaction. Returns (records archived, weeks written).
+def archive_progress(cutoff=None, batch_size=ARCHIVE_CUSTOMERS_PER_BATCH):
+    horizon = archive_cutoff()
+    if cutoff is None:
+        cutoff = horizon
+    elif cutoff > horizon:
+        raise ValueError(f'Records from {horizon} on are within PROGRESS_HOT_DAYS and stay hot.')
+    archivable = _archivable(cutoff)
+    customer_ids = sorted(archivable.order_by().values_list('customer_id', flat=True).distinct())
+
+    archived = weeks_written = 0
+    for start in range(0, len(customer_ids), batch_size):
+        batch = customer_ids[start:start + batch_size]
+        with transaction.atomic():
+            rows = list(
+                archivable.filter(customer_id__in=batch).select_for_update()
+                .values_list('id', 'customer_id', 'date', 'weight_kg')
+            )
+            weeks_written += _store_weeks(batch, _summarise(rows))
+            ids = [row[0] for row in rows]
+            for offset in range(0, len(ids), DELETE_CHUNK_SIZE):
+                ProgressTracking.objects.filter(pk__in=ids[offset:offset + DELETE_CHUNK_SIZE]).delete()
+        archived += len(rows)
+    return archived, weeks_written
+
+
+def archived_weeks(customers=Q(), since=None):
+    # None when the window starts inside the hot horizon: no archived week
+    # can fall in it, which holds for every dashboard window
+    if since is not None and since >= archive_cutoff():
+        return None
+    weeks = ProgressArchive.objects.filter(customers)
+    if since is not None:
+        weeks = weeks.filter(date__gte=since)
+    return weeks
+
+
+# (customer_id, date, weight_kg) rows for the customers matching
+# `customers`, a Q over the `customer` relation, ordered by customer and
+# date. Hot records come as they are and each archived week as one row at
+# its mean date and weight, so callers needn't care where a record lives.
+def weight_rows(customers=Q(), since=None):
+    hot = ProgressTracking.objects.filter(customers)
+    if since is not None:
+        hot = hot.filter(date__gte=since)
+    rows = list(hot.order_by('customer_id', 'date', 'id').values_list('customer_id', 'date', 'weight_kg'))
+
+    weeks = archived_weeks(customers, since)
+    if weeks is None:
+        return rows
+    archived = list(weeks.order_by('customer_id', 'date').values_list('customer_id', 'date', 'weight_kg'))
+    if not archived:
+        return rows
+    # Both lists are sorted, which timsort merges in linear time
+    return sorted(archived + rows, key=lambda row: (row[0], row[1]))
+
+
+class DayNumber(Func):
+    # A date column as date.toordinal(), for day arithmetic in SQL
+    template = '(JULIANDAY(%(expressions)s) - 1721424.5)'
+    output_field = FloatField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="(%(expressions)s - DATE '0001-01-01' + 1)",
+                           **extra_context)
+
+
+# weight_rows() as one unordered (customer_id, day, weight_kg) queryset, day
+# being a DayNumber, for callers that aggregate the points in SQL
+def weight_points(customers=Q(), since=None):
+    hot = ProgressTracking.objects.filter(customers)
+    if since is not None:
+        hot = hot.filter(date__gte=since)
+    points = hot.order_by().annotate(day=DayNumber('date')).values_list('customer_id', 'day', 'weight_kg')
+
+    weeks = archived_weeks(customers, since)
+    if weeks is None:
+        return points
+    return points.union(
+        weeks.order_by().annotate(day=DayNumber('date')).values_list('customer_id', 'day', 'weight_kg'),
+        all=True,
+    )
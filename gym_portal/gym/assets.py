@@ -0,0 +1,199 @@
+# gym_portal/gym/assets.py
+import gzip
+import mimetypes
+import os
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip variants are written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico')
+# Keep a variant only if it saves at least this fraction of the original
+MIN_SAVING = 0.05
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed names (admin fallbacks, files missing from the manifest) may change
+# on the next deploy
+MUTABLE_CACHE_CONTROL = 'public, max-age=300'
+# For a .br/.gz file requested by its own name, as FileResponse types them;
+# it is the compressed bytes, not the CSS or JS inside them
+ENCODED_CONTENT_TYPES = {
+    'br': 'application/x-brotli',
+    'gzip': 'application/gzip',
+}
+
+
+def _encoders():
+    # In order of preference when the client accepts several
+    if brotli is not None:
+        yield 'br', '.br', lambda data: brotli.compress(data, quality=11)
+    yield 'gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_file(path):
+    with open(path, 'rb') as source:
+        data = source.read()
+    written = []
+    for encoding, suffix, compress in _encoders():
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            written.append(target)
+            continue
+        compressed = compress(data)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            continue
+        with open(target, 'wb') as output:
+            output.write(compressed)
+        written.append(target)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Content-hashed names plus .br/.gz siblings written by collectstatic, for
+    # StaticAssetMiddleware to serve
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
+
+    def stored_name(self, name):
+        # Before the first collectstatic (development, tests) there is no
+        # manifest; and a file the templates reference but the project does
+        # not ship (favicon.ico) should not fail the whole page.
+        if not self.hashed_files:
+            return name
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+class StaticAsset:
+    def __init__(self, path, immutable):
+        content_type, encoding = mimetypes.guess_type(path)
+        if encoding:
+            content_type = ENCODED_CONTENT_TYPES.get(encoding)
+        self.content_type = content_type or 'application/octet-stream'
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL
+        self.variants = []  # (encoding, path, size, etag, last_modified), preferred first
+        for encoding, suffix, _ in _encoders():
+            self._add_variant(encoding, path + suffix)
+        self._add_variant(None, path)
+
+    def _add_variant(self, encoding, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        # A strong ETag per encoding: the bytes on the wire differ
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        self.variants.append((encoding, path, stat.st_size, etag, int(stat.st_mtime)))
+
+    @property
+    def compressed(self):
+        return len(self.variants) > 1
+
+    def variant(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for variant in self.variants:
+            if variant[0] is None or variant[0] in accepted or '*' in accepted:
+                return variant
+        return self.variants[-1]
+
+
+class StaticAssetMiddleware:
+    # Serves STATIC_ROOT from the application process: the precompressed
+    # variant the client accepts, a strong ETag, and a year of immutable
+    # caching for content-hashed names. Files are looked up once and
+    # remembered until the process restarts, as collectstatic runs at
+    # deploy time. With DEBUG on, staticfiles' runserver serves the source
+    # files instead.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.root = str(settings.STATIC_ROOT)
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self._assets = {}
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def find(self, path):
+        asset = self._assets.get(path)
+        if asset is None:
+            name = path[len(self.prefix):]
+            try:
+                full_path = safe_join(self.root, name)
+            except SuspiciousFileOperation:
+                return None
+            if not os.path.isfile(full_path):
+                return None  # misses are not remembered, so junk URLs can't grow the table
+            asset = self._assets[path] = StaticAsset(full_path, name in self.hashed_names)
+        return asset
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        asset = self.find(request.path_info)
+        if asset is None:
+            return None
+        encoding, path, size, etag, last_modified = asset.variant(request.headers.get('Accept-Encoding', ''))
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+            response.headers.pop('Content-Disposition', None)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = asset.cache_control
+        if asset.compressed:
+            response['Vary'] = 'Accept-Encoding'
+        if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+            response['X-Content-Type-Options'] = 'nosniff'
+        return response
@@ -0,0 +1,156 @@
+# gym_portal/gym/benchmark.py
+import math
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from accounts import urls as accounts_urls
+from . import images, urls as gym_urls
+from .models import DietPlan, WorkoutPlan
+from .seeding import SEED_PASSWORD
+
+# (label, who is logged in, method, URL name, URL args taken from the
+# fixture, query string or form data). Every URL in gym.urls and
+# accounts.urls must appear at least once; see missing_url_names().
+SCENARIOS = (
+    ('home', None, 'get', 'home', (), None),
+    ('signup_customer', None, 'get', 'signup_customer', (), None),
+    ('signup_trainer', None, 'get', 'signup_trainer', (), None),
+    ('login', None, 'get', 'login', (), None),
+    ('login_submit', None, 'post', 'login', (), 'credentials'),
+    ('dashboard', 'customer', 'get', 'dashboard', (), None),
+    ('logout', 'customer', 'post', 'logout', (), None),
+    ('customer_dashboard', 'customer', 'get', 'customer_dashboard', (), None),
+    ('customer_profile_edit', 'customer', 'get', 'customer_profile_edit', (), None),
+    ('add_progress', 'customer', 'get', 'add_progress', (), None),
+    ('progress_photo', 'customer', 'get', 'progress_photo', ('photo_record_id', 'thumb.jpg'), None),
+    ('trainer_dashboard', 'trainer', 'get', 'trainer_dashboard', (), None),
+    ('trainer_customers_list', 'trainer', 'get', 'trainer_customers_list', (), None),
+    ('trainer_customers_search', 'trainer', 'get', 'trainer_customers_list', (), {'search': 'nair'}),
+    ('trainer_customers_bmi', 'trainer', 'get', 'trainer_customers_list', (), {'bmi': 'Overweight'}),
+    ('trainer_customer_autocomplete', 'trainer', 'get', 'trainer_customer_autocomplete', (), {'q': 'mee'}),
+    ('trainer_off_track_customers', 'trainer', 'get', 'trainer_off_track_customers', (), None),
+    ('trainer_customer_detail', 'trainer', 'get', 'trainer_customer_detail', ('customer_id',), None),
+    ('trainer_create_diet_plan', 'trainer', 'get', 'trainer_create_diet_plan', ('customer_id',), None),
+    ('trainer_create_workout_plan', 'trainer', 'get', 'trainer_create_workout_plan', ('customer_id',), None),
+    ('trainer_import_progress', 'trainer', 'get', 'trainer_import_progress', ('customer_id',), None),
+    ('trainer_edit_diet_plan', 'trainer', 'get', 'trainer_edit_diet_plan', ('diet_plan_id',), None),
+    ('trainer_edit_workout_plan', 'trainer', 'get', 'trainer_edit_workout_plan', ('workout_plan_id',), None),
+    ('trainer_bulk_assign_plan', 'trainer', 'get', 'trainer_bulk_assign_plan', ('diet',), None),
+    ('export_progress', 'trainer', 'get', 'export_data', ('progress',), {'format': 'csv'}),
+    ('api_profile', 'customer', 'get', 'api_v1_profile', (), None),
+    ('api_plans', 'customer', 'get', 'api_v1_plans', (), None),
+    ('api_progress', 'customer', 'get', 'api_v1_progress', (), {'fields': 'date,weight_kg'}),
+    ('instrumentation_metrics', 'staff', 'get', 'instrumentation_metrics', (), None),
+)
+
+
+def missing_url_names():
+    covered = {scenario[3] for scenario in SCENARIOS}
+    names = {pattern.name for pattern in gym_urls.urlpatterns + accounts_urls.urlpatterns}
+    return sorted(names - covered)
+
+
+class Fixture:
+    # The accounts and objects the scenarios act on, picked from seeded data
+    def __init__(self, prefix='seed'):
+        self.customer = (User.objects.filter(username__startswith=f'{prefix}_customer_', groups__name='Customer')
+                         .order_by('id').first())
+        diet_plan = DietPlan.objects.filter(customer=self.customer, trainer__isnull=False).first()
+        if diet_plan is None:
+            raise ValueError(f'No seeded "{prefix}" customer with a plan to benchmark with.')
+        # Trainers may only edit their own plans, so act as this plan's trainer
+        self.trainer = diet_plan.trainer
+        self.staff, _ = User.objects.get_or_create(username=f'{prefix}_staff', defaults={'is_staff': True})
+        self.customer_id = self.customer.pk
+        self.diet_plan_id = diet_plan.pk
+        self.workout_plan_id = (WorkoutPlan.objects.filter(customer=self.customer, trainer=self.trainer)
+                                .values_list('id', flat=True).first())
+        self.credentials = {'username': self.customer.username, 'password': SEED_PASSWORD}
+        self.photo_record_id = self._photo_record().pk
+
+    def _photo_record(self):
+        # Seeded progress has no photos; give the latest weigh-in one
+        record = self.customer.progress_records.exclude(photo='').exclude(photo__isnull=True).first()
+        if record is None:
+            record = self.customer.progress_records.first()
+            buffer = BytesIO()
+            Image.new('RGB', (1200, 900), (180, 120, 90)).save(buffer, 'JPEG')
+            record.photo.save(f'benchmark_{record.pk}.jpg', ContentFile(buffer.getvalue()))
+            images.process_progress_photo(record.pk)
+        return record
+
+    def user(self, role):
+        return getattr(self, role) if role else None
+
+    def resolve(self, value):
+        return getattr(self, value) if isinstance(value, str) and hasattr(self, value) else value
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile; fine for the handful of samples taken per view
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _request(fixture, role, method, url_name, args, data):
+    # A fresh client per request, so session-changing views (login, logout)
+    # start from the same state every time; the login itself is not timed.
+    client = Client()
+    user = fixture.user(role)
+    if user is not None:
+        client.force_login(user)
+    url = reverse(url_name, args=[fixture.resolve(arg) for arg in args])
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(url, fixture.resolve(data) or {})
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code >= 400:
+        raise ValueError(f'{method.upper()} {url} returned {response.status_code}')
+    return elapsed, len(queries)
+
+
+# Runs every scenario `iterations` times after `warmup` untimed runs and
+# returns {label: {'p50_ms', 'p95_ms', 'queries'}}.
+def run_benchmark(fixture, iterations=20, warmup=2, scenarios=SCENARIOS):
+    results = {}
+    for label, role, method, url_name, args, data in scenarios:
+        for _ in range(warmup):
+            _request(fixture, role, method, url_name, args, data)
+        timings, query_counts = [], []
+        for _ in range(iterations):
+            elapsed, queries = _request(fixture, role, method, url_name, args, data)
+            timings.append(elapsed)
+            query_counts.append(queries)
+        results[label] = {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': max(query_counts),
+        }
+    return results
+
+
+# Differences worse than `tolerance` (a fraction of the baseline p95) or any
+# extra query, as (scale, label, message) tuples.
+def compare(results, baseline, tolerance=0.2):
+    regressions = []
+    for scale, views in results.items():
+        for label, current in views.items():
+            previous = baseline.get(scale, {}).get(label)
+            if previous is None:
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append((scale, label, f'queries {previous["queries"]} -> {current["queries"]}'))
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append((scale, label, f'p95 {previous["p95_ms"]} ms -> {current["p95_ms"]} ms'))
+    return regressions
@@ -0,0 +1,25 @@
+# gym_portal/gym/concurrency.py
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _in_worker(function):
+    def run():
+        # Worker threads outlive requests, so apply CONN_MAX_AGE and health
+        # checks to their connections the way request_started does
+        close_old_connections()
+        return function()
+    return run
+
+
+# Runs independent blocking callables (typically ORM queries) at the same
+# time and returns their results in order. Django's async ORM sends every
+# query through the one thread-sensitive executor, so awaiting several of
+# them still runs them back to back; here each callable gets a worker thread,
+# and with it a database connection, of its own.
+async def run_concurrently(*functions):
+    return await asyncio.gather(
+        *(sync_to_async(_in_worker(function), thread_sensitive=False)() for function in functions)
+    )
@@ -0,0 +1,23 @@
+# gym_portal/gym/database.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def _set_journal_mode(cursor, mode):
+    # Stored in the database file, so it's changed only when it differs
+    cursor.execute('PRAGMA journal_mode')
+    if cursor.fetchone()[0].lower() != mode.lower():
+        cursor.execute(f'PRAGMA journal_mode = {mode}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        journal_mode = getattr(settings, 'SQLITE_JOURNAL_MODE', None)
+        if journal_mode:
+            _set_journal_mode(cursor, journal_mode)
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,166 @@
+# gym_portal/gym/exports.py
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+from .models import CustomerProfile, DietPlan, ProgressArchive, ProgressTracking, WorkoutPlan
+
+EXPORT_CHUNK_SIZE = 2000
+# Rows are joined into one string per yield to keep per-chunk overhead low
+ROWS_PER_WRITE = 500
+
+DATASETS = {
+    'progress': {
+        'model': ProgressTracking,
+        'fields': ['id', 'customer_id', 'customer__username', 'date', 'weight_kg', 'notes'],
+        'date_field': 'date',
+        'customer_field': 'customer',
+        'trainer_field': None,
+        # Weekly summaries of records moved out by gym.archive
+        'archive_model': ProgressArchive,
+    },
+    'diet_plans': {
+        'model': DietPlan,
+        'fields': ['id', 'customer_id', 'customer__username', 'trainer_id', 'title', 'description',
+                   'breakfast', 'lunch', 'dinner', 'snacks', 'water_intake', 'supplements', 'notes',
+                   'calories_target', 'protein_target', 'is_active', 'created_at', 'updated_at'],
+        'date_field': 'created_at',
+        'customer_field': 'customer',
+        'trainer_field': 'trainer',
+    },
+    'workout_plans': {
+        'model': WorkoutPlan,
+        'fields': ['id', 'customer_id', 'customer__username', 'trainer_id', 'title', 'description',
+                   'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+                   'duration_weeks', 'is_active', 'created_at', 'updated_at'],
+        'date_field': 'created_at',
+        'customer_field': 'customer',
+        'trainer_field': 'trainer',
+    },
+    'profiles': {
+        'model': CustomerProfile,
+        'fields': ['id', 'user_id', 'user__username', 'user__first_name', 'user__last_name', 'user__email',
+                   'age', 'height_cm', 'weight_kg', 'diseases', 'goal', 'activity_level', 'phone',
+                   'emergency_contact', 'created_at', 'updated_at'],
+        'date_field': 'created_at',
+        'customer_field': 'user',
+        'trainer_field': None,
+    },
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def _customers_trained_by(trainer_id):
+    # Customers that have a diet or workout plan written by the trainer
+    return User.objects.filter(
+        models.Q(id__in=DietPlan.objects.filter(trainer_id=trainer_id).values('customer_id')) |
+        models.Q(id__in=WorkoutPlan.objects.filter(trainer_id=trainer_id).values('customer_id'))
+    ).values('id')
+
+
+def _date_range(model, field_name, start, end):
+    # DateTimeFields are compared against aware midnight bounds rather than
+    # with __date, so the filter stays a plain range on the column.
+    lookups = {}
+    if isinstance(model._meta.get_field(field_name), models.DateTimeField):
+        if start:
+            lookups[f'{field_name}__gte'] = timezone.make_aware(datetime.combine(start, time.min))
+        if end:
+            lookups[f'{field_name}__lt'] = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    else:
+        if start:
+            lookups[f'{field_name}__gte'] = start
+        if end:
+            lookups[f'{field_name}__lte'] = end
+    return lookups
+
+
+def _filtered(model, spec, start, end, trainer_id, customer_id):
+    customer_field = spec['customer_field']
+    queryset = model.objects.filter(**_date_range(model, spec['date_field'], start, end))
+    if customer_id:
+        queryset = queryset.filter(**{f'{customer_field}_id': customer_id})
+    if trainer_id:
+        if spec['trainer_field']:
+            queryset = queryset.filter(**{f"{spec['trainer_field']}_id": trainer_id})
+        else:
+            queryset = queryset.filter(**{f'{customer_field}_id__in': _customers_trained_by(trainer_id)})
+    return queryset
+
+
+def export_queryset(dataset, start=None, end=None, trainer_id=None, customer_id=None):
+    spec = DATASETS[dataset]
+    filters = (start, end, trainer_id, customer_id)
+    # Primary-key order walks the table without a sort step
+    queryset = _filtered(spec['model'], spec, *filters).order_by('pk').values_list(*spec['fields'])
+    if 'archive_model' in spec:
+        archived = _filtered(spec['archive_model'], spec, *filters).order_by('pk').values_list(
+            'customer_id', 'customer__username', 'date', 'weight_kg', 'samples', 'weight_min_kg', 'weight_max_kg',
+        )
+        return WithArchive(archived, queryset)
+    return queryset
+
+
+class WithArchive:
+    # Archived weeks, shaped like progress rows (no id; the note describes
+    # the week), followed by the hot rows
+    def __init__(self, archived, queryset):
+        self.archived = archived
+        self.queryset = queryset
+
+    def iterator(self, chunk_size):
+        for customer_id, username, day, weight, samples, low, high in self.archived.iterator(chunk_size=chunk_size):
+            note = f'Weekly mean of {samples} archived weigh-in(s), {low:g}-{high:g} kg'
+            yield None, customer_id, username, day, round(weight, 2), note
+        yield from self.queryset.iterator(chunk_size=chunk_size)
+
+
+class Echo:
+    # File-like object whose write() hands the value back to csv.writer
+    def write(self, value):
+        return value
+
+
+def _jsonable(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_csv(dataset, queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(DATASETS[dataset]['fields'])
+    yield from _batched(writer.writerow(row) for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+
+def stream_jsonl(dataset, queryset):
+    fields = DATASETS[dataset]['fields']
+    yield from _batched(
+        json.dumps({field: _jsonable(value) for field, value in zip(fields, row)}) + '\n'
+        for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def stream_export(dataset, fmt, queryset):
+    if fmt == 'jsonl':
+        return stream_jsonl(dataset, queryset)
+    return stream_csv(dataset, queryset)
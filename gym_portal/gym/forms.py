@@ -1,6 +1,10 @@
 # gym_portal/gym/forms.py
 from django import forms
-from .models import CustomerProfile, DietPlan, WorkoutPlan, ProgressTracking
+from django.contrib.auth.models import User
+from django.db.models import Case, Q, When
+from django.utils.choices import BaseChoiceIterator
+from . import plans
+from .models import GOAL_CHOICES, CustomerProfile, DietPlan, WorkoutPlan, ProgressTracking
 
 class CustomerProfileForm(forms.ModelForm):
     class Meta:
@@ -52,3 +56,74 @@ class ProgressTrackingForm(forms.ModelForm):
                 self.fields[field].widget = forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
             else:
                 self.fields[field].widget.attrs.update({'class': 'form-control'})
+
+class CustomerChoices(BaseChoiceIterator):
+    # Checkbox choices read from `queryset` only when the widget renders, so
+    # a submitted form doesn't load them. Widgets leave BaseChoiceIterator
+    # instances alone; any other iterable is read to normalize it.
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def __iter__(self):
+        for user in self.queryset:
+            yield user.pk, f'{user.get_full_name()} (@{user.username})'
+
+
+class BulkPlanAssignForm(forms.Form):
+    source_plan = forms.ModelChoiceField(queryset=DietPlan.objects.none(), label='Plan to copy')
+    goal = forms.ChoiceField(choices=[('', 'No goal filter')] + GOAL_CHOICES, required=False,
+                             label='Assign to every customer with goal')
+    customers = forms.ModelMultipleChoiceField(queryset=User.objects.none(), required=False,
+                                               widget=forms.CheckboxSelectMultiple)
+    deactivate_previous = forms.BooleanField(required=False, initial=True,
+                                             label="Deactivate the customers' current active plans")
+
+    # Checkboxes shown at once; `customer_query` narrows them down
+    CUSTOMER_CHOICES_LIMIT = 50
+
+    def __init__(self, *args, plan_model, trainer, customer_query='', **kwargs):
+        super().__init__(*args, **kwargs)
+        # Copies made by earlier bulk assignments aren't offered again
+        self.fields['source_plan'].queryset = plan_model.objects.filter(
+            trainer=trainer, copied_from__isnull=True,
+        ).select_related('customer')
+        customers = plans.trainer_customers(trainer)
+        self.fields['customers'].queryset = customers
+
+        # Ticked customers stay listed, first, when the form is shown again
+        selected = []
+        if self.is_bound:
+            selected = [value for value in self.data.getlist(self.add_prefix('customers')) if value.isdigit()]
+        shown = customers
+        if customer_query:
+            shown = shown.filter(
+                Q(username__icontains=customer_query) | Q(first_name__icontains=customer_query)
+                | Q(last_name__icontains=customer_query) | Q(pk__in=selected)
+            )
+        shown = shown.order_by('first_name', 'id')
+        if selected:
+            shown = shown.order_by(Case(When(pk__in=selected, then=0), default=1), 'first_name', 'id')
+        self.fields['customers'].widget.choices = CustomerChoices(
+            shown[:self.CUSTOMER_CHOICES_LIMIT + len(selected)]
+        )
+        for field in ('source_plan', 'goal'):
+            self.fields[field].widget.attrs.update({'class': 'form-control'})
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('goal') and not cleaned_data.get('customers'):
+            raise forms.ValidationError('Select customers or a goal to assign the plan to.')
+        return cleaned_data
+
+
+class ProgressImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV, JSON or JSON Lines export with date and weight columns',
+                           widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json,.jsonl'}))
+
+
+class ExportFilterForm(forms.Form):
+    # Query-string filters of gym.views.export_data; all optional
+    start = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+    end = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+    trainer = forms.IntegerField(required=False, min_value=1)
+    customer = forms.IntegerField(required=False, min_value=1)
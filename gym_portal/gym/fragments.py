@@ -0,0 +1,45 @@
+# gym_portal/gym/fragments.py
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+# Rendered plan cards are cached in two layers: the whole plans section per
+# customer, keyed on a version token that changes whenever one of their
+# plans does, and each card inside it keyed on plan id and updated_at, so a
+# new version only re-renders the cards that actually changed.
+PLAN_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Names of the {% cache %} blocks around the plans sections
+CUSTOMER_PLAN_CARDS = 'customer_plan_cards'
+TRAINER_PLAN_CARDS = 'trainer_plan_cards'
+
+
+def plans_version_key(customer_id):
+    return f'gym:plans:version:{customer_id}'
+
+
+def plans_version(customer_id):
+    key = plans_version_key(customer_id)
+    version = cache.get(key)
+    if version is None:
+        # A random token rather than a counter, so an evicted version can
+        # never come back and match fragments rendered before it
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_plans_version(customer_ids):
+    cache.set_many({plans_version_key(customer_id): uuid4().hex for customer_id in customer_ids}, None)
+
+
+def plan_cards_cached(fragment_name, customer_id, version):
+    return cache.has_key(make_template_fragment_key(fragment_name, [customer_id, version]))
+
+
+def plan_context(customer_id):
+    return {
+        'plans_version': plans_version(customer_id),
+        'fragment_timeout': PLAN_FRAGMENT_TIMEOUT,
+    }
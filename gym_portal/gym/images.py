@@ -0,0 +1,94 @@
+# gym_portal/gym/images.py
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from tasks.queue import task
+
+# Longest edge in pixels for each derived size
+VARIANT_SIZES = {
+    'thumb': 320,
+    'medium': 1024,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# For re-encoding the original itself, which is kept as the master copy
+ORIGINAL_FORMATS = {
+    'JPEG': {'quality': 95, 'subsampling': 0},
+    'WEBP': {'quality': 95},
+}
+ORIGINAL = 'original'  # the upload itself, as named in photo URLs
+
+
+def variant_name(record_id, size, ext):
+    return f'progress_photos/variants/{record_id}/{size}.{ext}'
+
+
+def variant_names(record_id):
+    return [variant_name(record_id, size, ext) for size in VARIANT_SIZES for ext in VARIANT_FORMATS]
+
+
+def _encode(image, fmt, options):
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _replace(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+# Queued by add_progress (process_progress_photo.delay) so the upload
+# request returns as soon as the original file is stored
+@task(max_attempts=3)
+def process_progress_photo(record_id):
+    from .models import ProgressTracking
+
+    record = ProgressTracking.objects.filter(pk=record_id).first()
+    if record is None or not record.photo:
+        return
+
+    with default_storage.open(record.photo.name, 'rb') as fh:
+        image = Image.open(fh)
+        image.load()
+    original_format = image.format or 'JPEG'
+    if original_format == 'MPO':  # multi-picture JPEGs from phone cameras
+        original_format = 'JPEG'
+
+    if image.getexif():
+        # Bake the EXIF orientation into the pixels; re-encoding without passing
+        # exif= drops the metadata (GPS position, camera serial, ...) as well.
+        options = dict(ORIGINAL_FORMATS.get(original_format, {}))
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        image = ImageOps.exif_transpose(image)
+        if original_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        photo_name = _replace(record.photo.name, _encode(image, original_format, options))
+    else:
+        # Nothing to strip or rotate, so the upload is kept byte for byte
+        photo_name = record.photo.name
+
+    rgb = image.convert('RGB')
+    for size, edge in VARIANT_SIZES.items():
+        variant = rgb.copy()
+        variant.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        for ext, (fmt, options) in VARIANT_FORMATS.items():
+            _replace(variant_name(record.pk, size, ext), _encode(variant, fmt, options))
+
+    ProgressTracking.objects.filter(pk=record.pk).update(
+        photo=photo_name, photo_processed=True, updated_at=timezone.now()  # auto_now doesn't apply to update()
+    )
+
+
+def delete_variants(record_id):
+    for name in variant_names(record_id):
+        if default_storage.exists(name):
+            default_storage.delete(name)
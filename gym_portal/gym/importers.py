@@ -0,0 +1,291 @@
+# gym_portal/gym/importers.py
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import archive
+from .models import ProgressArchive, ProgressTracking
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+LB_TO_KG = 0.45359237
+
+# Header spellings seen in other gyms' exports and smart-scale apps
+COLUMN_ALIASES = {
+    'username': ('username', 'user', 'customer', 'member'),
+    'date': ('date', 'day', 'date_time', 'datetime', 'timestamp', 'measured_at', 'time'),
+    'weight_kg': ('weight_kg', 'weight', 'weight (kg)', 'weight(kg)', 'weight [kg]', 'body weight', 'kg'),
+    'weight_lb': ('weight_lb', 'weight_lbs', 'weight (lb)', 'weight (lbs)', 'weight(lbs)', 'lb', 'lbs'),
+    'notes': ('notes', 'note', 'comment', 'comments'),
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y')
+
+
+class ProgressImportError(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        return (f'{self.processed} rows read, {self.created} imported, '
+                f'{self.duplicates} duplicates skipped, {self.error_count} errors')
+
+
+def _column_map(keys):
+    normalized = {key.strip().lower(): key for key in keys if key}
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[column] = normalized[alias]
+                break
+    return columns
+
+
+def parse_date(value):
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value).date()
+        except (OverflowError, OSError, ValueError):
+            raise ValueError(f'timestamp {value} is out of range')
+    value = str(value).strip()
+    # Drop any time-of-day part ("2024-03-01 07:12:00", "2024-03-01T07:12Z")
+    value = value.replace('T', ' ').split(' ')[0]
+    try:
+        return date.fromisoformat(value)  # the common case, much faster than strptime
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'unrecognised date "{value}"')
+
+
+def parse_row(row, columns):
+    if 'date' not in columns:
+        raise ValueError('no date column')
+    raw_date = row.get(columns['date'])
+    if raw_date in (None, ''):
+        raise ValueError('missing date')
+    record_date = parse_date(raw_date)
+    if record_date > timezone.localdate():
+        raise ValueError('date is in the future')
+
+    if row.get(columns.get('weight_kg')) not in (None, ''):
+        weight = float(row[columns['weight_kg']])
+    elif row.get(columns.get('weight_lb')) not in (None, ''):
+        weight = round(float(row[columns['weight_lb']]) * LB_TO_KG, 2)
+    else:
+        raise ValueError('missing weight')
+    if not 0 < weight < 500:
+        raise ValueError(f'implausible weight {weight}')
+
+    username = row.get(columns['username']) if 'username' in columns else None
+    notes = row.get(columns['notes']) if 'notes' in columns else ''
+    return (str(username).strip() if username else None), record_date, weight, str(notes or '')
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for line, row in enumerate(reader, start=2):
+        yield line, row
+
+
+def read_jsonl(stream):
+    for line, text in enumerate(stream, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            yield line, json.loads(text)
+        except json.JSONDecodeError:
+            yield line, None
+
+
+def read_json_array(stream, chunk_size=64 * 1024):
+    # Incrementally decode a top-level JSON array so a multi-year export is
+    # never loaded into memory in one piece.
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ProgressImportError('Expected a JSON array of records.')
+    buffer = buffer[1:]
+    index = 0
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ProgressImportError(f'Malformed JSON after record {index}.')
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        index += 1
+        yield index, obj
+        buffer = buffer[end:]
+
+
+def _readable(records):
+    # Text that can't be decoded, or CSV the csv module gives up on, ends the
+    # whole file rather than one row. Batches before it are already saved.
+    line = 0
+    try:
+        for line, row in records:
+            yield line, row
+    except UnicodeDecodeError:
+        raise ProgressImportError(
+            f'The file is not UTF-8 text (stopped after record {line}). Save it as UTF-8 and upload it again.'
+        )
+    except csv.Error as exc:
+        raise ProgressImportError(f'Unreadable CSV after record {line}: {exc}.')
+
+
+def read_records(stream, fmt):
+    if fmt == 'csv':
+        return _readable(read_csv(stream))
+    if fmt == 'jsonl':
+        return _readable(read_jsonl(stream))
+    if fmt == 'json':
+        return _readable(read_json_array(stream))
+    raise ProgressImportError(f'Unsupported format "{fmt}".')
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('csv', 'json', 'jsonl'):
+        return extension
+    if extension == 'ndjson':
+        return 'jsonl'
+    raise ProgressImportError('Upload a .csv, .json or .jsonl file.')
+
+
+def text_stream(binary_file):
+    # utf-8-sig swallows the BOM that spreadsheet exports like to add
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+def _import_batch(batch, customer, report, seen):
+    usernames = {username for _, (username, _, _, _) in batch if username}
+    customers_by_username = {}
+    if customer is None and usernames:
+        customers_by_username = dict(
+            User.objects.filter(username__in=usernames, groups__name='Customer').values_list('username', 'id')
+        )
+
+    resolved = []
+    lines = []
+    for line, (username, record_date, weight, notes) in batch:
+        if customer is not None:
+            customer_id = customer.pk
+        elif not username:
+            report.add_error(line, 'missing username')
+            continue
+        elif username not in customers_by_username:
+            report.add_error(line, f'unknown customer "{username}"')
+            continue
+        else:
+            customer_id = customers_by_username[username]
+        resolved.append((customer_id, record_date, weight, notes))
+        lines.append(line)
+
+    # The archive keeps weekly summaries, not days, so a row can't be checked
+    # against what was archived; rows in an archived week are turned away
+    # rather than merged into it a second time
+    cutoff = archive.archive_cutoff()
+    old_rows = [row for row in resolved if row[1] < cutoff]
+    if old_rows:
+        archived = set(
+            ProgressArchive.objects.filter(
+                customer_id__in={row[0] for row in old_rows},
+                week_start__in={archive.week_start(row[1]) for row in old_rows},
+            ).values_list('customer_id', 'week_start')
+        )
+        kept = []
+        for line, row in zip(lines, resolved):
+            week = archive.week_start(row[1])
+            if row[1] < cutoff and (row[0], week) in archived:
+                report.add_error(line, f'the week of {week} is already archived')
+            else:
+                kept.append(row)
+        resolved = kept
+
+    if not resolved:
+        return
+    existing = set(
+        ProgressTracking.objects.filter(
+            customer_id__in={row[0] for row in resolved},
+            date__in={row[1] for row in resolved},
+        ).values_list('customer_id', 'date')
+    )
+
+    records = []
+    for customer_id, record_date, weight, notes in resolved:
+        key = (customer_id, record_date)
+        if key in existing or key in seen:
+            report.duplicates += 1
+            continue
+        seen.add(key)
+        records.append(ProgressTracking(customer_id=customer_id, date=record_date, weight_kg=weight, notes=notes))
+
+    with transaction.atomic():
+        ProgressTracking.objects.bulk_create(records, batch_size=IMPORT_BATCH_SIZE)
+    report.created += len(records)
+
+
+# Imports (line, mapping) pairs as ProgressTracking rows, validating and
+# writing them in batches. A (customer, date) that already exists or repeats
+# within the file is skipped, and one falling in a week already archived is
+# reported as an error. With `customer` every row is attributed to
+# them; otherwise each row needs a username column naming a customer.
+def import_progress(records, customer=None, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    report = ImportReport()
+    seen = set()
+    signature = columns = None
+    batch = []
+    for line, row in records:
+        report.processed += 1
+        if not isinstance(row, dict):
+            report.add_error(line, 'not a JSON object')
+            continue
+        # CSV rows share one header; JSON records may each use other keys
+        if tuple(row) != signature:
+            signature = tuple(row)
+            columns = _column_map(signature)
+        try:
+            batch.append((line, parse_row(row, columns)))
+        except (TypeError, ValueError) as exc:
+            report.add_error(line, str(exc))
+        if len(batch) >= batch_size:
+            _import_batch(batch, customer, report, seen)
+            batch = []
+            if on_batch:
+                on_batch(report)
+    if batch:
+        _import_batch(batch, customer, report, seen)
+    if on_batch:
+        on_batch(report)
+    return report
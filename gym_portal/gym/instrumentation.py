@@ -0,0 +1,245 @@
+# gym_portal/gym/instrumentation.py
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+        self.view_name = None
+        # Async views run queries from several threads at once
+        self._lock = threading.Lock()
+
+    def add_query(self, duration_ms):
+        with self._lock:
+            self.queries += 1
+            self.db_ms += duration_ms
+
+    def as_dict(self):
+        return {
+            'view': self.view_name,
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 2),
+            'template_ms': round(self.template_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+        }
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def as_dict(self, count):
+        labels = [f'<={bound}' for bound in self.bounds] + [f'>{self.bounds[-1]}']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'mean': round(self.total / count, 2) if count else 0,
+            'max': round(self.maximum, 2),
+        }
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.over_budget = 0
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.template_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def observe(self, metrics, over_budget):
+        self.requests += 1
+        self.over_budget += int(over_budget)
+        self.queries.observe(metrics.queries)
+        self.db_ms.observe(metrics.db_ms)
+        self.template_ms.observe(metrics.template_ms)
+        self.total_ms.observe(metrics.total_ms)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'over_budget': self.over_budget,
+            'queries': self.queries.as_dict(self.requests),
+            'db_ms': self.db_ms.as_dict(self.requests),
+            'template_ms': self.template_ms.as_dict(self.requests),
+            'total_ms': self.total_ms.as_dict(self.requests),
+        }
+
+
+class MetricsRegistry:
+    # Per-process aggregates; each worker reports its own share
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, metrics, over_budget):
+        with self._lock:
+            self._views.setdefault(metrics.view_name, ViewStats()).observe(metrics, over_budget)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def query_budget(view_name):
+    return getattr(settings, 'VIEW_QUERY_BUDGETS', {}).get(view_name)
+
+
+def time_budget_ms(view_name):
+    budgets = getattr(settings, 'VIEW_TIME_BUDGETS_MS', {})
+    return budgets.get(view_name, getattr(settings, 'VIEW_TIME_BUDGET_DEFAULT_MS', None))
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query((time.perf_counter() - start) * 1000)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # Installed on every connection, in whatever thread opens it, so queries
+    # from sync_to_async worker threads are counted too; it is a no-op
+    # outside an instrumented request.
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # Drop-in TEMPLATES backend that reports render time to the middleware
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    def _finish(self, request, response, metrics, start):
+        metrics.total_ms = (time.perf_counter() - start) * 1000
+        match = getattr(request, 'resolver_match', None)
+        metrics.view_name = (match.view_name if match else None) or 'unresolved'
+        exceeded = self._check_budgets(request, metrics)
+        registry.record(metrics, bool(exceeded))
+
+        response.instrumentation = metrics
+        if getattr(settings, 'INSTRUMENTATION_HEADERS', settings.DEBUG):
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries", '
+                f'tpl;dur={metrics.template_ms:.1f}, total;dur={metrics.total_ms:.1f}'
+            )
+            if exceeded:
+                response['X-Budget-Exceeded'] = ', '.join(exceeded)
+        return response
+
+    def _check_budgets(self, request, metrics):
+        exceeded = []
+        max_queries = query_budget(metrics.view_name)
+        if max_queries is not None and metrics.queries > max_queries:
+            exceeded.append('queries')
+        max_ms = time_budget_ms(metrics.view_name)
+        if max_ms is not None and metrics.total_ms > max_ms:
+            exceeded.append('time')
+        if exceeded:
+            logger.warning(
+                'View %s over budget (%s): %d queries (budget %s), %.1f ms (budget %s) for %s',
+                metrics.view_name, ', '.join(exceeded), metrics.queries, max_queries,
+                metrics.total_ms, max_ms, request.path,
+            )
+        return exceeded
+
+
+class QueryBudgetTestMixin:
+    # For TestCase subclasses: asserts that a response served through the
+    # middleware stayed within the query budget pinned for its view.
+    def assertWithinQueryBudget(self, response):
+        metrics = getattr(response, 'instrumentation', None)
+        self.assertIsNotNone(metrics, 'InstrumentationMiddleware is not installed')
+        budget = query_budget(metrics.view_name)
+        self.assertIsNotNone(budget, f'No query budget pinned for view "{metrics.view_name}"')
+        self.assertLessEqual(
+            metrics.queries, budget,
+            f'View "{metrics.view_name}" ran {metrics.queries} queries; its budget is {budget}',
+        )
@@ -0,0 +1,32 @@
+# gym_portal/gym/management/commands/archive_progress.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from gym import archive
+
+
+class Command(BaseCommand):
+    help = ('Move progress records older than PROGRESS_HOT_DAYS into weekly archive summaries. '
+            'Records with a photo are kept. Run it daily or weekly, e.g. from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive only records dated before this earlier day (YYYY-MM-DD).')
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_CUSTOMERS_PER_BATCH,
+                            help='Customers archived per transaction.')
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff()
+        if options['before']:
+            try:
+                cutoff = parse_date(options['before'])
+            except ValueError:
+                cutoff = None
+            if cutoff is None:
+                raise CommandError('--before must be a date in YYYY-MM-DD format.')
+        try:
+            records, weeks = archive.archive_progress(cutoff, batch_size=options['batch_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {records} progress record(s) dated before {cutoff} into {weeks} weekly summaries.'
+        ))
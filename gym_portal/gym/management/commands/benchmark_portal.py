@@ -0,0 +1,94 @@
+# gym_portal/gym/management/commands/benchmark_portal.py
+import json
+import tempfile
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from gym import benchmark, seeding
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database at one or more scales and time every view in gym.urls and '
+            'accounts.urls with the test client, reporting p50/p95 latency and query counts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000],
+                            help='Customer counts to benchmark at, smallest first.')
+        parser.add_argument('--trainers', type=int, default=10)
+        parser.add_argument('--years', type=float, default=2)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the results to a JSON baseline file.')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare the results against a baseline file.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 slowdown against the baseline, as a fraction (default 0.2).')
+
+    def handle(self, *args, **options):
+        missing = benchmark.missing_url_names()
+        if missing:
+            raise CommandError(f'No benchmark scenario for: {", ".join(missing)}')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as stream:
+                    baseline = json.load(stream)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Could not read baseline: {exc}')
+
+        results = self.run(options)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as stream:
+                json.dump(results, stream, indent=2, sort_keys=True)
+            self.stdout.write(f'Baseline written to {options["save_baseline"]}')
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, tolerance=options['tolerance'])
+            for scale, label, message in regressions:
+                self.stderr.write(f'{scale} customers, {label}: {message}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def run(self, options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # The fixture's progress photo goes to a throwaway MEDIA_ROOT, and the
+        # repeated login posts mustn't trip the login throttle
+        media_root = tempfile.TemporaryDirectory()
+        media_settings = override_settings(MEDIA_ROOT=media_root.name, AUTH_THROTTLE_RATES={})
+        media_settings.enable()
+        results = {}
+        try:
+            seeded = 0
+            for scale in sorted(options['scales']):
+                seeding.seed_portal(
+                    trainers=options['trainers'] if not seeded else 0,
+                    customers=scale - seeded,
+                    years=options['years'],
+                    seed=options['seed'] + scale,
+                )
+                seeded = scale
+                cache.clear()
+                views = benchmark.run_benchmark(
+                    benchmark.Fixture(), iterations=options['iterations'], warmup=options['warmup'],
+                )
+                results[str(scale)] = views
+                self.report(scale, views)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        finally:
+            media_settings.disable()
+            media_root.cleanup()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return results
+
+    def report(self, scale, views):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{scale} customers'))
+        self.stdout.write(f'{"view":34} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8}')
+        for label, result in views.items():
+            self.stdout.write(f'{label:34} {result["p50_ms"]:9.2f} {result["p95_ms"]:9.2f} {result["queries"]:8d}')
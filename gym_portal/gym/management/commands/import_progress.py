@@ -0,0 +1,42 @@
+# gym_portal/gym/management/commands/import_progress.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from gym import importers
+
+
+class Command(BaseCommand):
+    help = ('Bulk import progress records from a CSV, JSON or JSON Lines file. '
+            'Rows need a date and a weight column and, unless --customer is given, a username column.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'],
+                            help='File format; detected from the extension by default.')
+        parser.add_argument('--customer', help='Username to attribute every row to.')
+        parser.add_argument('--batch-size', type=int, default=importers.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        customer = None
+        if options['customer']:
+            customer = User.objects.filter(username=options['customer'], groups__name='Customer').first()
+            if customer is None:
+                raise CommandError(f'No customer with username "{options["customer"]}".')
+
+        try:
+            fmt = options['format'] or importers.detect_format(options['path'])
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = importers.import_progress(
+                    importers.read_records(stream, fmt),
+                    customer=customer,
+                    batch_size=options['batch_size'],
+                    on_batch=lambda progress: self.stdout.write(str(progress)),
+                )
+        except (OSError, importers.ProgressImportError) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... and {report.error_count - len(report.errors)} more errors')
+        self.stdout.write(self.style.SUCCESS(f'Import finished: {report}'))
@@ -0,0 +1,27 @@
+# gym_portal/gym/management/commands/process_progress_photos.py
+from django.core.management.base import BaseCommand
+
+from gym.images import process_progress_photo
+from gym.models import ProgressTracking
+
+
+class Command(BaseCommand):
+    help = 'Strip EXIF data and generate thumbnail/medium variants for unprocessed progress photos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Reprocess photos that already have variants.')
+
+    def handle(self, *args, **options):
+        records = ProgressTracking.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['all']:
+            records = records.filter(photo_processed=False)
+
+        processed = 0
+        for record_id in records.values_list('pk', flat=True).iterator():
+            try:
+                process_progress_photo(record_id)
+            except Exception as exc:
+                self.stderr.write(f'Progress record {record_id}: {exc}')
+                continue
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} progress photo(s).'))
@@ -0,0 +1,41 @@
+# gym_portal/gym/management/commands/provision_members.py
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.roles import CUSTOMER, TRAINER
+from gym import importers, provisioning
+
+
+class Command(BaseCommand):
+    help = ('Bulk create members from a CSV, JSON or JSON Lines file. Rows need a username and may carry '
+            'role, first_name, last_name, email, password_hash or password, and the profile fields. '
+            'Members without a password get an unusable one and must reset it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'],
+                            help='File format; detected from the extension by default.')
+        parser.add_argument('--role', choices=[CUSTOMER, TRAINER], default=CUSTOMER,
+                            help='Role for rows without a role column.')
+        parser.add_argument('--batch-size', type=int, default=provisioning.PROVISION_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Threads hashing plain-text passwords.')
+
+    def handle(self, *args, **options):
+        try:
+            fmt = options['format'] or importers.detect_format(options['path'])
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = provisioning.provision_members(
+                    importers.read_records(stream, fmt),
+                    default_role=options['role'],
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    on_batch=lambda progress: self.stdout.write(str(progress)),
+                )
+        except (OSError, importers.ProgressImportError) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... and {report.error_count - len(report.errors)} more errors')
+        self.stdout.write(self.style.SUCCESS(f'Provisioning finished: {report}'))
@@ -0,0 +1,14 @@
+# gym_portal/gym/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from gym import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer full-text search index from the user and profile tables.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The full-text search index is only supported on SQLite.')
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Customer search index rebuilt.'))
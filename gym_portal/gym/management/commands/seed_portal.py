@@ -0,0 +1,34 @@
+# gym_portal/gym/management/commands/seed_portal.py
+from django.core.management.base import BaseCommand, CommandError
+
+from gym import seeding
+
+
+class Command(BaseCommand):
+    help = ('Seed synthetic trainers and customers with profiles, plans and progress history '
+            'for local load testing. Every seeded account uses the same password.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trainers', type=int, default=10)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--years', type=float, default=2, help='Years of progress history per customer.')
+        parser.add_argument('--plans', type=int, default=3, help='Diet and workout plans per customer.')
+        parser.add_argument('--prefix', default='seed', help='Username prefix for the seeded accounts.')
+        parser.add_argument('--seed', type=int, help='Random seed, for a reproducible data set.')
+        parser.add_argument('--password', default=seeding.SEED_PASSWORD)
+
+    def handle(self, *args, **options):
+        try:
+            report = seeding.seed_portal(
+                trainers=options['trainers'],
+                customers=options['customers'],
+                years=options['years'],
+                plans_per_customer=options['plans'],
+                prefix=options['prefix'],
+                seed=options['seed'],
+                password=options['password'],
+                on_progress=lambda progress: self.stdout.write(str(progress)),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Seeded {report}.'))
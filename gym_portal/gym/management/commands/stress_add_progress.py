@@ -0,0 +1,91 @@
+# gym_portal/gym/management/commands/stress_add_progress.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from gym import seeding
+from gym.benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = ('Concurrency stress test: many customers POST add_progress at once against a throwaway '
+            'file-backed copy of the schema, reporting throughput and any "database is locked" failures.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=50, help='Progress records posted per thread.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This stress test targets the SQLite profile.')
+        threads = options['threads']
+        setup_test_environment()
+        # An in-memory test database would hide locking entirely, so use a file
+        directory = tempfile.mkdtemp(prefix='gym-stress-')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'stress.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seeding.seed_portal(trainers=1, customers=threads, years=0, plans_per_customer=1, prefix='stress')
+            customers = list(User.objects.filter(username__startswith='stress_customer_').order_by('id'))
+            self.run_writers(customers, options['writes'])
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_writers(self, customers, writes):
+        timings, failures = [], []
+        lock = threading.Lock()
+        start_together = threading.Barrier(len(customers))
+
+        def writer(customer):
+            client = Client()
+            client.force_login(customer)
+            url = reverse('add_progress')
+            start_together.wait()
+            try:
+                for number in range(writes):
+                    data = {'weight_kg': 80 - number * 0.01, 'notes': 'stress',
+                            'date': (timezone.localdate() - timedelta(days=number)).isoformat()}
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(url, data)
+                        failed = response.status_code != 302 and f'HTTP {response.status_code}'
+                    except OperationalError as exc:
+                        failed = str(exc)
+                    with lock:
+                        timings.append((time.perf_counter() - started) * 1000)
+                        if failed:
+                            failures.append(failed)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=writer, args=(customer,)) for customer in customers]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        total = len(timings)
+        self.stdout.write(
+            f'{total} writes from {len(customers)} threads in {elapsed:.2f}s ({total / elapsed:.0f}/s), '
+            f'p50 {percentile(timings, 50):.1f} ms, p95 {percentile(timings, 95):.1f} ms'
+        )
+        if failures:
+            locked = sum('locked' in failure for failure in failures)
+            raise CommandError(f'{len(failures)} writes failed ({locked} with "database is locked"): {failures[0]}')
+        self.stdout.write(self.style.SUCCESS('No failed writes.'))
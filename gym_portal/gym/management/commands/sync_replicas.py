@@ -0,0 +1,45 @@
+# gym_portal/gym/management/commands/sync_replicas.py
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from gym.routers import replicas
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database onto each file in DATABASE_REPLICAS with the online backup '
+            'API, once or every --interval seconds. Stands in for real replication in local setups.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying, pausing this many seconds between runs.')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replicas only copies SQLite databases.')
+        if not replicas():
+            raise CommandError('No replicas configured; set GYM_DB_REPLICAS.')
+
+        while True:
+            started = time.perf_counter()
+            for alias in replicas():
+                self.copy(primary['NAME'], settings.DATABASES[alias]['NAME'])
+            self.stdout.write(f'Copied to {", ".join(replicas())} in {time.perf_counter() - started:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        # backup() takes a consistent snapshot without blocking writers for
+        # the whole copy, and readers of the replica see the old or the new
+        # copy, never a half-written one.
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target, pages=1024)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,122 @@
+# gym_portal/gym/media.py
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+STREAM_BLOCK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    # The (start, end) of a single byte range, end inclusive. None means
+    # "send the whole file" (no header, several ranges, or one we don't
+    # understand); ValueError means the range lies outside the file.
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # The last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError('range starts after the end of the file')
+    if end < start:
+        return None
+    return start, end
+
+
+def _if_range_passes(request, etag, last_modified):
+    # Send the requested range only if the client's copy is still current
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return etag in parse_etags(value)
+    since = parse_http_date_safe(value)
+    return since is not None and last_modified <= since
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            chunk = stream.read(min(STREAM_BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload(name, path, content_type):
+    # Let the front-end server push the bytes; it handles Range and
+    # conditional requests itself
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        response[header] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    else:
+        response[header] = path
+    return response
+
+
+# Streams media file `name` after the caller's permission checks. FileResponse
+# lets the WSGI server use its zero-copy file wrapper (sendfile) for whole
+# files; a single byte range is answered with 206 and conditional requests
+# with 304. With MEDIA_SENDFILE_HEADER set the transfer is handed to the
+# front-end server instead. Storages without local paths redirect to the
+# storage's own URL.
+def serve_media(request, name, cache_control='private, no-cache'):
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return HttpResponseRedirect(default_storage.url(name))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    if getattr(settings, 'MEDIA_SENDFILE_HEADER', None):
+        response = _offload(name, path, content_type)
+        response['Cache-Control'] = cache_control
+        return response
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        if request.method == 'GET' and _if_range_passes(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.headers.get('Range', ''), stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response.headers.pop('Content-Disposition', None)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS gym_customer_search USING fts5("
+        "username, first_name, last_name, email, phone, diseases, goal, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO gym_customer_search (rowid, username, first_name, last_name, email, phone, diseases, goal) "
+        "SELECT u.id, u.username, u.first_name, u.last_name, u.email, "
+        "COALESCE(p.phone, ''), COALESCE(p.diseases, ''), REPLACE(COALESCE(p.goal, ''), '_', ' ') "
+        "FROM auth_user u LEFT JOIN gym_customerprofile p ON p.user_id = u.id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS gym_customer_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0002_customer_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresstracking',
+            name='photo_processed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_bmi(apps, schema_editor):
+    CustomerProfile = apps.get_model('gym', 'CustomerProfile')
+    profiles = CustomerProfile.objects.filter(weight_kg__isnull=False, height_cm__isnull=False).only(
+        'id', 'weight_kg', 'height_cm'
+    )
+    batch = []
+    for profile in profiles.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        if not (profile.weight_kg and profile.height_cm):
+            continue
+        bmi = round(profile.weight_kg / ((profile.height_cm / 100) ** 2), 2)
+        profile.bmi = bmi
+        if bmi < 18.5:
+            profile.bmi_category = 'Underweight'
+        elif bmi < 25:
+            profile.bmi_category = 'Normal weight'
+        elif bmi < 30:
+            profile.bmi_category = 'Overweight'
+        else:
+            profile.bmi_category = 'Obese'
+        batch.append(profile)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            CustomerProfile.objects.bulk_update(batch, ['bmi', 'bmi_category'])
+            batch = []
+    if batch:
+        CustomerProfile.objects.bulk_update(batch, ['bmi', 'bmi_category'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0003_progress_photo_processed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerprofile',
+            name='bmi',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='bmi_category',
+            field=models.CharField(choices=[('Underweight', 'Underweight'), ('Normal weight', 'Normal weight'), ('Overweight', 'Overweight'), ('Obese', 'Obese'), ('Unknown', 'Unknown')], db_index=True, default='Unknown', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_bmi, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0004_customerprofile_stored_bmi'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(fields=['customer', '-created_at'], name='diet_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['customer', '-created_at'], name='diet_customer_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progresstracking',
+            index=models.Index(fields=['customer', '-date'], name='progress_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['customer', '-created_at'], name='workout_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['customer', '-created_at'], name='workout_customer_active_idx'),
+        ),
+    ]
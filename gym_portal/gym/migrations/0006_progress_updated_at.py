@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0005_dashboard_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresstracking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0006_progress_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('date', models.DateField()),
+                ('samples', models.PositiveIntegerField()),
+                ('weight_kg', models.FloatField()),
+                ('weight_min_kg', models.FloatField()),
+                ('weight_max_kg', models.FloatField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_archive', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-week_start'],
+                'constraints': [models.UniqueConstraint(fields=('customer', 'week_start'), name='progress_archive_week_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0007_progress_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dietplan',
+            name='copied_from',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copies', to='gym.dietplan'),
+        ),
+        migrations.AddField(
+            model_name='workoutplan',
+            name='copied_from',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copies', to='gym.workoutplan'),
+        ),
+    ]
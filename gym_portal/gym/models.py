@@ -2,6 +2,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.urls import reverse
+from .images import ORIGINAL
 
 GOAL_CHOICES = [
     ('lose_weight', 'Lose Weight'),
@@ -19,6 +21,35 @@ ACTIVITY_LEVEL_CHOICES = [
     ('extremely_active', 'Extremely Active (very hard exercise, physical job)'),
 ]
 
+BMI_UNKNOWN = 'Unknown'
+BMI_CATEGORY_CHOICES = [
+    ('Underweight', 'Underweight'),
+    ('Normal weight', 'Normal weight'),
+    ('Overweight', 'Overweight'),
+    ('Obese', 'Obese'),
+    (BMI_UNKNOWN, 'Unknown'),
+]
+
+
+def calculate_bmi(weight_kg, height_cm):
+    if weight_kg and height_cm:
+        height_m = height_cm / 100
+        return round(weight_kg / (height_m ** 2), 2)
+    return None
+
+
+def bmi_category(bmi):
+    if bmi:
+        if bmi < 18.5:
+            return "Underweight"
+        elif bmi < 25:
+            return "Normal weight"
+        elif bmi < 30:
+            return "Overweight"
+        else:
+            return "Obese"
+    return BMI_UNKNOWN
+
 class CustomerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer_profile')
     age = models.PositiveIntegerField(null=True, blank=True)
@@ -29,32 +60,27 @@ class CustomerProfile(models.Model):
     activity_level = models.CharField(max_length=20, choices=ACTIVITY_LEVEL_CHOICES, blank=True)
     phone = models.CharField(max_length=15, blank=True)
     emergency_contact = models.CharField(max_length=100, blank=True)
+    # Derived from weight and height in save() so they can be filtered,
+    # sorted and aggregated in SQL
+    bmi = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    bmi_category = models.CharField(max_length=20, choices=BMI_CATEGORY_CHOICES, default=BMI_UNKNOWN,
+                                    editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"CustomerProfile({self.user.username})"
 
-    @property
-    def bmi(self):
-        if self.weight_kg and self.height_cm:
-            height_m = self.height_cm / 100
-            return round(self.weight_kg / (height_m ** 2), 2)
-        return None
+    def update_bmi(self):
+        self.bmi = calculate_bmi(self.weight_kg, self.height_cm)
+        self.bmi_category = bmi_category(self.bmi)
 
-    @property
-    def bmi_category(self):
-        bmi = self.bmi
-        if bmi:
-            if bmi < 18.5:
-                return "Underweight"
-            elif bmi < 25:
-                return "Normal weight"
-            elif bmi < 30:
-                return "Overweight"
-            else:
-                return "Obese"
-        return "Unknown"
+    def save(self, *args, **kwargs):
+        self.update_bmi()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'weight_kg', 'height_cm'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'bmi', 'bmi_category'}
+        super().save(*args, **kwargs)
 
 class DietPlan(models.Model):
     customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='diet_plans')
@@ -73,9 +99,26 @@ class DietPlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # The plan a bulk assignment copied this one from (gym.plans)
+    copied_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                    related_name='copies')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='diet_customer_created_idx'),
+            # Dashboards only ever list a customer's active plans
+            models.Index(fields=['customer', '-created_at'], condition=models.Q(is_active=True),
+                         name='diet_customer_active_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The flag as loaded, so gym.signals can keep the active-plan counter
+        # without reading the row again before each save
+        instance._loaded_active = instance.is_active if 'is_active' in field_names else None
+        return instance
 
     def __str__(self):
         return f"DietPlan({self.title}) for {self.customer.username}"
@@ -96,9 +139,18 @@ class WorkoutPlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # The plan a bulk assignment copied this one from (gym.plans)
+    copied_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                    related_name='copies')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='workout_customer_created_idx'),
+            # Dashboards only ever list a customer's active plans
+            models.Index(fields=['customer', '-created_at'], condition=models.Q(is_active=True),
+                         name='workout_customer_active_idx'),
+        ]
 
     def __str__(self):
         return f"WorkoutPlan({self.title}) for {self.customer.username}"
@@ -109,9 +161,59 @@ class ProgressTracking(models.Model):
     date = models.DateField(default=timezone.now)
     notes = models.TextField(blank=True)
     photo = models.ImageField(upload_to='progress_photos/', blank=True, null=True)
+    photo_processed = models.BooleanField(default=False, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['customer', '-date'], name='progress_customer_date_idx'),
+        ]
 
     def __str__(self):
         return f"Progress({self.customer.username}) - {self.date}"
+
+    def photo_variant_url(self, size, ext):
+        # Served through gym.views.progress_photo, which checks who is asking
+        if not self.photo:
+            return None
+        variant = f'{size}.{ext}' if self.photo_processed else ORIGINAL
+        return reverse('progress_photo', args=[self.pk, variant])
+
+    @property
+    def thumb_webp_url(self):
+        return self.photo_variant_url('thumb', 'webp')
+
+    @property
+    def thumb_jpg_url(self):
+        return self.photo_variant_url('thumb', 'jpg')
+
+    @property
+    def medium_webp_url(self):
+        return self.photo_variant_url('medium', 'webp')
+
+    @property
+    def medium_jpg_url(self):
+        return self.photo_variant_url('medium', 'jpg')
+
+
+class ProgressArchive(models.Model):
+    # One week of a customer's weigh-ins, moved out of ProgressTracking by
+    # gym.archive once older than PROGRESS_HOT_DAYS. `date` is the mean
+    # weigh-in date and `weight_kg` the mean weight of the `samples` rows.
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress_archive')
+    week_start = models.DateField()
+    date = models.DateField()
+    samples = models.PositiveIntegerField()
+    weight_kg = models.FloatField()
+    weight_min_kg = models.FloatField()
+    weight_max_kg = models.FloatField()
+
+    class Meta:
+        ordering = ['-week_start']
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'week_start'], name='progress_archive_week_uniq'),
+        ]
+
+    def __str__(self):
+        return f"ProgressArchive({self.customer.username}) - week of {self.week_start}"
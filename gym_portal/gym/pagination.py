@@ -0,0 +1,117 @@
+# gym_portal/gym/pagination.py
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(values):
+    # Dates and decimals go in as strings, which filter() accepts back
+    raw = json.dumps(list(values), separators=(',', ':'), cls=DjangoJSONEncoder).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _model_field(model, path):
+    *relations, name = path.split(LOOKUP_SEP)
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def decode_cursor(cursor, model_fields):
+    # Malformed or tampered cursors simply restart from the first page. Each
+    # value is converted and validated by its model field, so what reaches
+    # filter() is something the database accepts.
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(model_fields):
+        return None
+    key = []
+    for field, value in zip(model_fields, values):
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        key.append(value)
+    return key
+
+
+def _after(fields, values, reverse=False):
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), generalised to n fields
+    lookup = 'lt' if reverse else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        clause = Q(**{f'{field}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            clause &= Q(**{prev_field: prev_value})
+        condition |= clause
+    return condition
+
+
+# Seeks on the key `fields` (ascending, or descending with descending=True)
+# instead of using OFFSET, so every page is a single range scan no matter how
+# deep it is. `after`/`before` are cursors taken from a previously rendered page.
+def keyset_paginate(queryset, fields, page_size, after=None, before=None, descending=False):
+    fields = list(fields)
+    model_fields = [_model_field(queryset.model, field) for field in fields]
+    after_key = decode_cursor(after, model_fields)
+    before_key = decode_cursor(before, model_fields)
+    forward = [f'-{field}' for field in fields] if descending else fields
+    backward = fields if descending else [f'-{field}' for field in fields]
+
+    if before_key is not None:
+        queryset = queryset.filter(_after(fields, before_key, reverse=not descending))
+        queryset = queryset.order_by(*backward)
+    else:
+        if after_key is not None:
+            queryset = queryset.filter(_after(fields, after_key, reverse=descending))
+        queryset = queryset.order_by(*forward)
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before_key is not None:
+        rows.reverse()
+
+    def key(obj):
+        return [getattr(obj, field) for field in fields]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or before_key is not None:
+            next_cursor = encode_cursor(key(rows[-1]))
+        if after_key is not None or (before_key is not None and has_more):
+            previous_cursor = encode_cursor(key(rows[0]))
+    return KeysetPage(rows, next_cursor, previous_cursor)
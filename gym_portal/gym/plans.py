@@ -0,0 +1,56 @@
+# gym_portal/gym/plans.py
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import DietPlan, WorkoutPlan
+from . import fragments, stats
+
+# Fields that belong to the copy rather than to the plan's content
+NON_COPIED_FIELDS = {'id', 'customer', 'trainer', 'created_at', 'updated_at', 'is_active', 'copied_from'}
+
+BULK_BATCH_SIZE = 500
+
+
+def trainer_customers(trainer):
+    # Customers holding a diet or workout plan from `trainer`
+    return User.objects.filter(groups__name='Customer').filter(
+        Exists(DietPlan.objects.filter(customer=OuterRef('pk'), trainer=trainer))
+        | Exists(WorkoutPlan.objects.filter(customer=OuterRef('pk'), trainer=trainer))
+    )
+
+
+def customers_for_assignment(customers=(), goal=''):
+    customer_ids = {customer.pk for customer in customers}
+    if goal:
+        customer_ids.update(
+            User.objects.filter(groups__name='Customer', customer_profile__goal=goal).values_list('id', flat=True)
+        )
+    return sorted(customer_ids)
+
+
+def bulk_assign_plan(source_plan, customer_ids, trainer, deactivate_previous=False):
+    plan_model = type(source_plan)
+    content = {
+        field.attname: getattr(source_plan, field.attname)
+        for field in plan_model._meta.concrete_fields
+        if field.name not in NON_COPIED_FIELDS
+    }
+    plans = [
+        plan_model(customer_id=customer_id, trainer=trainer, is_active=True, copied_from=source_plan, **content)
+        for customer_id in customer_ids
+    ]
+
+    with transaction.atomic():
+        if deactivate_previous:
+            plan_model.objects.filter(customer_id__in=customer_ids, is_active=True).update(
+                is_active=False, updated_at=timezone.now()  # auto_now doesn't apply to update()
+            )
+        created = plan_model.objects.bulk_create(plans, batch_size=BULK_BATCH_SIZE)
+
+    # bulk_create() and update() bypass the per-row signals
+    fragments.bump_plans_version(customer_ids)
+    if plan_model is DietPlan:
+        stats.invalidate(stats.TOTAL_DIET_PLANS)
+    return created
@@ -0,0 +1,196 @@
+# gym_portal/gym/provisioning.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+
+from accounts.roles import CUSTOMER, CUSTOMER_GROUP, TRAINER, TRAINER_GROUP, group_id
+from .importers import MAX_REPORTED_ERRORS
+from .models import ACTIVITY_LEVEL_CHOICES, GOAL_CHOICES, CustomerProfile, bmi_category, calculate_bmi
+from . import search, stats
+
+PROVISION_BATCH_SIZE = 1000
+ROLE_GROUPS = {CUSTOMER: CUSTOMER_GROUP, TRAINER: TRAINER_GROUP}
+USER_FIELDS = ('first_name', 'last_name', 'email')
+PROFILE_TEXT_FIELDS = ('diseases', 'phone', 'emergency_contact')
+GOALS = {value for value, _ in GOAL_CHOICES}
+ACTIVITY_LEVELS = {value for value, _ in ACTIVITY_LEVEL_CHOICES}
+
+
+class ProvisionReport:
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.existing = 0
+        self.error_count = 0
+        self.errors = []
+        self.user_ids = {}  # username -> id of every user created
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        return (f'{self.processed} rows read, {self.created} members created, '
+                f'{self.existing} existing usernames skipped, {self.error_count} errors')
+
+
+class Member:
+    def __init__(self, user, role, profile, password=None):
+        self.user = user
+        self.role = role
+        self.profile = profile
+        self.password = password  # plain text still to be hashed, if any
+
+
+def _number(row, field, cast):
+    value = row.get(field)
+    if value in (None, ''):
+        return None
+    value = cast(value)
+    if value <= 0:
+        raise ValueError(f'{field} must be positive')
+    return value
+
+
+def parse_member(row, default_role=CUSTOMER):
+    username = str(row.get('username') or '').strip()
+    if not username:
+        raise ValueError('missing username')
+    if len(username) > 150:
+        raise ValueError('username is longer than 150 characters')
+    try:
+        User.username_validator(username)
+    except ValidationError:
+        raise ValueError(f'invalid username "{username}"')
+
+    role = str(row.get('role') or default_role).strip().lower()
+    if role not in ROLE_GROUPS:
+        raise ValueError(f'unknown role "{role}"')
+
+    user = User(username=username, **{field: str(row.get(field) or '').strip() for field in USER_FIELDS})
+    if user.email:
+        try:
+            validate_email(user.email)
+        except ValidationError:
+            raise ValueError(f'invalid email "{user.email}"')
+
+    password = None
+    if row.get('password_hash'):
+        user.password = str(row['password_hash'])
+        try:
+            identify_hasher(user.password)
+        except ValueError:
+            raise ValueError('password_hash is not a Django password hash')
+    elif row.get('password'):
+        password = str(row['password'])
+    else:
+        user.set_unusable_password()  # members set one through a password reset
+
+    profile = {field: str(row.get(field) or '').strip() for field in PROFILE_TEXT_FIELDS}
+    profile['age'] = _number(row, 'age', int)
+    profile['height_cm'] = _number(row, 'height_cm', float)
+    profile['weight_kg'] = _number(row, 'weight_kg', float)
+    profile['goal'] = str(row.get('goal') or '').strip()
+    if profile['goal'] and profile['goal'] not in GOALS:
+        raise ValueError(f'unknown goal "{profile["goal"]}"')
+    profile['activity_level'] = str(row.get('activity_level') or '').strip()
+    if profile['activity_level'] and profile['activity_level'] not in ACTIVITY_LEVELS:
+        raise ValueError(f'unknown activity level "{profile["activity_level"]}"')
+    return Member(user, role, profile, password)
+
+
+def _hash_passwords(members, workers):
+    # PBKDF2 runs in OpenSSL without the GIL, so threads hash in parallel
+    pending = [member for member in members if member.password is not None]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = pool.map(make_password, [member.password for member in pending])
+        for member, password_hash in zip(pending, hashes):
+            member.user.password = password_hash
+            member.password = None
+
+
+def _provision_batch(batch, report, seen, workers):
+    existing = set(
+        User.objects.filter(username__in=[member.user.username for _, member in batch])
+        .values_list('username', flat=True)
+    )
+    members = []
+    for line, member in batch:
+        username = member.user.username
+        if username in existing or username in seen:
+            report.existing += 1
+            continue
+        seen.add(username)
+        members.append(member)
+    if not members:
+        return
+    _hash_passwords(members, workers)
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([member.user for member in members])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                       .values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        profiles = []
+        for member in members:
+            profile = CustomerProfile(user_id=member.user.pk, **member.profile)
+            profile.update_bmi()  # save() is skipped, so derive it here
+            profiles.append(profile)
+        CustomerProfile.objects.bulk_create(profiles)
+        membership = User.groups.through
+        membership.objects.bulk_create([
+            membership(user_id=member.user.pk, group_id=group_id(ROLE_GROUPS[member.role]))
+            for member in members
+        ])
+
+    user_ids = [member.user.pk for member in members]
+    search.index_users(user_ids)
+    report.created += len(members)
+    report.user_ids.update((member.user.username, member.user.pk) for member in members)
+
+
+# Creates a user, a CustomerProfile and a role group membership for each
+# (line, mapping) pair, a batch at a time. Rows carry a username and
+# optionally role, first_name, last_name, email, password_hash (already
+# hashed) or password (hashed here on `workers` threads), and the profile
+# fields. Usernames that already exist are skipped.
+#
+# Everything is written with bulk_create(), which sends no post_save or
+# m2m_changed signals, so the per-user handlers in gym.signals and
+# accounts.signals never run; their work (profile row, search index, home
+# page counters) is done here once per batch instead. Nothing is
+# disconnected, so concurrent sign-ups keep their signals.
+def provision_members(records, default_role=CUSTOMER, batch_size=PROVISION_BATCH_SIZE, workers=4, on_batch=None):
+    report = ProvisionReport()
+    seen = set()
+    batch = []
+    for line, row in records:
+        report.processed += 1
+        if not isinstance(row, dict):
+            report.add_error(line, 'not a JSON object')
+            continue
+        try:
+            batch.append((line, parse_member(row, default_role)))
+        except (TypeError, ValueError) as exc:
+            report.add_error(line, str(exc))
+        if len(batch) >= batch_size:
+            _provision_batch(batch, report, seen, workers)
+            batch = []
+            if on_batch:
+                on_batch(report)
+    if batch:
+        _provision_batch(batch, report, seen, workers)
+    if on_batch:
+        on_batch(report)
+    if report.created:
+        stats.invalidate(stats.TOTAL_CUSTOMERS, stats.TOTAL_TRAINERS)
+    return report
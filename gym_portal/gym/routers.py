@@ -0,0 +1,108 @@
+# gym_portal/gym/routers.py
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps whose reads may be served by a replica. Sessions, admin log and
+# content types always use the primary.
+REPLICATED_APPS = {'gym', 'accounts', 'auth'}
+PIN_COOKIE = 'db_pin'
+
+_pinned = ContextVar('db_pinned', default=False)
+_wrote = ContextVar('db_wrote', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def pinned_to_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICATED_APPS or not replicas():
+            return None
+        # Inside a transaction, reads must see its uncommitted writes
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICATED_APPS:
+            # Read the rest of this request, and the next few, from the primary
+            _pinned.set(True)
+            wrote = _wrote.get()
+            if wrote is not None:
+                wrote.append(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are file copies of the primary (see sync_replicas)
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    # Unsafe requests read from the primary, and so does the same browser for
+    # DATABASE_PIN_SECONDS after any write, so the redirect that follows a
+    # POST sees what was just saved even if the replicas lag behind.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens, wrote = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._reset(tokens)
+        return self._finish(response, wrote)
+
+    async def __acall__(self, request):
+        tokens, wrote = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._reset(tokens)
+        return self._finish(response, wrote)
+
+    def _start(self, request):
+        pin = request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE in request.COOKIES
+        wrote = []
+        return (_pinned.set(pin), _wrote.set(wrote)), wrote
+
+    def _reset(self, tokens):
+        _pinned.reset(tokens[0])
+        _wrote.reset(tokens[1])
+
+    def _finish(self, response, wrote):
+        if wrote and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,123 @@
+# gym_portal/gym/search.py
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from .models import CustomerProfile
+
+# FTS5 table whose rowid is the user id. It is created by migration 0002 on
+# SQLite; other database backends fall back to icontains lookups.
+SEARCH_TABLE = 'gym_customer_search'
+
+# bm25 column weights, in table column order
+COLUMN_WEIGHTS = (10.0, 8.0, 8.0, 4.0, 4.0, 1.0, 1.0)
+
+# Ranked ids fetched per round, as a multiple of the results wanted
+SEARCH_OVERFETCH = 4
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _document_select():
+    user_table = User._meta.db_table
+    profile_table = CustomerProfile._meta.db_table
+    return (
+        f'SELECT u.id, u.username, u.first_name, u.last_name, u.email, '
+        f"COALESCE(p.phone, ''), COALESCE(p.diseases, ''), REPLACE(COALESCE(p.goal, ''), '_', ' ') "
+        f'FROM {user_table} u LEFT JOIN {profile_table} p ON p.user_id = u.id'
+    )
+
+
+def index_users(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids or not is_available():
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', user_ids)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, username, first_name, last_name, email, phone, diseases, goal) '
+            f'{_document_select()} WHERE u.id IN ({placeholders})',
+            user_ids,
+        )
+
+
+def remove_users(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids or not is_available():
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', user_ids)
+
+
+def rebuild_index():
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, username, first_name, last_name, email, phone, diseases, goal) '
+            f'{_document_select()}'
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def build_match_query(text):
+    # Every word must match; each one is quoted (so FTS operators typed by the
+    # user are inert) and prefix-matched for search-as-you-type.
+    tokens = _TOKEN_RE.findall(text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_user_ids(text, limit=50, offset=0):
+    match = build_match_query(text)
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+# Ranked ids of `members` (an unannotated user queryset) matching `text`.
+# The index holds every user, trainers included, so ranked ids are fetched
+# a few times `limit` at a time and kept if they are members; restricting
+# the MATCH itself with a subquery makes SQLite scan the whole index.
+def search_member_ids(members, text, limit=50):
+    found = []
+    batch = limit * SEARCH_OVERFETCH
+    offset = 0
+    while len(found) < limit:
+        ids = search_user_ids(text, limit=batch, offset=offset)
+        if not ids:
+            break
+        keep = set(members.filter(id__in=ids).values_list('id', flat=True))
+        found.extend(user_id for user_id in ids if user_id in keep)
+        if len(ids) < batch:
+            break
+        offset += batch
+    return found[:limit]
+
+
+# Members of `queryset` matching `text`, best match first. `members` is the
+# same selection without annotations, used to test membership cheaply; it
+# defaults to `queryset`. Returns None when the full-text index is not
+# available so callers can fall back.
+def search_customers(queryset, text, limit=50, members=None):
+    if not is_available():
+        return None
+    ids = search_member_ids(queryset if members is None else members, text, limit=limit)
+    if not ids:
+        return []
+    rank = {user_id: position for position, user_id in enumerate(ids)}
+    return sorted(queryset.filter(id__in=ids), key=lambda user: rank[user.id])
@@ -0,0 +1,146 @@
+# gym_portal/gym/seeding.py
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.roles import CUSTOMER, TRAINER, TRAINER_GROUP
+from .analytics import GOAL_DIRECTION
+from .models import ACTIVITY_LEVEL_CHOICES, GOAL_CHOICES, DietPlan, ProgressTracking, WorkoutPlan
+from .provisioning import provision_members
+from . import stats
+
+SEED_PASSWORD = 'seed-password'
+SEED_BATCH_SIZE = 2000
+FIRST_NAMES = ('Arjun', 'Meera', 'Rahul', 'Anjali', 'Vivek', 'Divya', 'Kiran', 'Lakshmi', 'Nikhil', 'Sneha',
+               'Joseph', 'Fathima', 'Akhil', 'Gayathri', 'Rohan', 'Aisha')
+LAST_NAMES = ('Nair', 'Menon', 'Pillai', 'Kumar', 'Thomas', 'Varghese', 'Iyer', 'Das', 'Joseph', 'Krishnan')
+MEALS = ('Oats and fruit', 'Idli and sambar', 'Grilled chicken salad', 'Dal, rice and vegetables',
+         'Paneer wrap', 'Fish curry and chapati', 'Egg white omelette', 'Sprouts and curd')
+WORKOUTS = ('Chest and triceps', 'Back and biceps', 'Legs', 'Shoulders and core', '5 km run',
+            'HIIT circuit', 'Rest', 'Mobility and stretching')
+
+
+class SeedReport:
+    def __init__(self):
+        self.trainers = 0
+        self.customers = 0
+        self.plans = 0
+        self.progress = 0
+
+    def __str__(self):
+        return (f'{self.trainers} trainers, {self.customers} customers, '
+                f'{self.plans} plans, {self.progress} progress rows')
+
+
+def _member(prefix, role, number, password_hash, rng):
+    return {
+        'username': f'{prefix}_{role}_{number:06d}', 'role': role, 'password_hash': password_hash,
+        'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+        'email': f'{prefix}.{role}.{number}@example.com',
+    }
+
+
+def _customer(prefix, number, password_hash, rng):
+    member = _member(prefix, CUSTOMER, number, password_hash, rng)
+    member.update(
+        age=rng.randint(18, 65), height_cm=round(rng.uniform(150, 195), 1), weight_kg=round(rng.uniform(50, 115), 1),
+        goal=rng.choice(GOAL_CHOICES)[0], activity_level=rng.choice(ACTIVITY_LEVEL_CHOICES)[0],
+        phone=f'9{rng.randint(100000000, 999999999)}',
+    )
+    return member
+
+
+def _provision(members):
+    report = provision_members(enumerate(members, start=1), batch_size=SEED_BATCH_SIZE)
+    if report.error_count:
+        raise ValueError(f'Could not seed members: {report.errors[0][1]}')
+    # (user id, member) for each member created, in order
+    return [(report.user_ids[member['username']], member) for member in members
+            if member['username'] in report.user_ids]
+
+
+def _plans(customer_id, trainer_id, count, rng):
+    diet_plans, workout_plans = [], []
+    for number in range(count):
+        active = number == count - 1
+        diet_plans.append(DietPlan(
+            customer_id=customer_id, trainer_id=trainer_id, title=f'Diet phase {number + 1}',
+            breakfast=rng.choice(MEALS), lunch=rng.choice(MEALS), dinner=rng.choice(MEALS),
+            water_intake='3-4 liters', calories_target=rng.randrange(1600, 3200, 100),
+            protein_target=rng.randrange(80, 200, 10), is_active=active,
+        ))
+        days = {day: rng.choice(WORKOUTS) for day in
+                ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')}
+        workout_plans.append(WorkoutPlan(
+            customer_id=customer_id, trainer_id=trainer_id, title=f'Training block {number + 1}',
+            duration_weeks=rng.choice((4, 6, 8, 12)), is_active=active, **days,
+        ))
+    return diet_plans, workout_plans
+
+
+def _progress(customer_id, goal, weight, days, rng):
+    # A noisy walk in the goal's direction, one weigh-in every 1-4 days
+    drift = (GOAL_DIRECTION.get(goal) or 0) * 0.03
+    day = timezone.localdate() - timedelta(days=days)
+    end = timezone.localdate()
+    while day <= end:
+        weight = max(40.0, weight + drift + rng.gauss(0, 0.25))
+        yield ProgressTracking(customer_id=customer_id, date=day, weight_kg=round(weight, 1))
+        day += timedelta(days=rng.randint(1, 4))
+
+
+# Inserts `trainers` trainers and `customers` customers (usernames
+# `<prefix>_<role>_<n>`) with profiles, plans and `years` of progress rows,
+# all through bulk_create. With trainers=0 the new customers are spread over
+# the trainers already in the database.
+def seed_portal(trainers, customers, years=2, plans_per_customer=3, prefix='seed', seed=None,
+                password=SEED_PASSWORD, on_progress=None):
+    rng = random.Random(seed)
+    report = SeedReport()
+    password_hash = make_password(password)
+    start = User.objects.filter(username__startswith=f'{prefix}_customer_').count()
+
+    new_trainer_ids = []
+    if trainers:
+        trainer_start = User.objects.filter(username__startswith=f'{prefix}_trainer_').count()
+        new_trainer_ids = [user_id for user_id, _ in _provision([
+            _member(prefix, TRAINER, number, password_hash, rng)
+            for number in range(trainer_start, trainer_start + trainers)
+        ])]
+        report.trainers = len(new_trainer_ids)
+    trainer_ids = list(User.objects.filter(groups__name=TRAINER_GROUP).values_list('id', flat=True))
+    if not trainer_ids:
+        raise ValueError('There are no trainers to assign plans to.')
+
+    profiles = dict(_provision([
+        _customer(prefix, number, password_hash, rng) for number in range(start, start + customers)
+    ]))
+    customer_ids = list(profiles)
+    report.customers = len(customer_ids)
+
+    chunk_size = SEED_BATCH_SIZE // 10
+    for offset in range(0, len(customer_ids), chunk_size):
+        diet_plans, workout_plans, progress = [], [], []
+        for customer_id in customer_ids[offset:offset + chunk_size]:
+            diets, workouts = _plans(customer_id, rng.choice(trainer_ids), plans_per_customer, rng)
+            diet_plans += diets
+            workout_plans += workouts
+            profile = profiles[customer_id]
+            progress += _progress(customer_id, profile['goal'], profile['weight_kg'], int(years * 365), rng)
+        with transaction.atomic():
+            DietPlan.objects.bulk_create(diet_plans, batch_size=SEED_BATCH_SIZE)
+            WorkoutPlan.objects.bulk_create(workout_plans, batch_size=SEED_BATCH_SIZE)
+            ProgressTracking.objects.bulk_create(progress, batch_size=SEED_BATCH_SIZE)
+        report.plans += len(diet_plans) + len(workout_plans)
+        report.progress += len(progress)
+        if on_progress:
+            on_progress(report)
+
+    # bulk_create skips the signals that keep this in sync; the member
+    # counters were refreshed by provision_members()
+    stats.invalidate(stats.TOTAL_DIET_PLANS)
+    return report
@@ -1,12 +1,120 @@
 # gym_portal/gym/signals.py
 from django.contrib.auth.models import User, Group
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import CustomerProfile
+from .models import CustomerProfile, DietPlan, ProgressTracking, WorkoutPlan
+from . import fragments, images, search, stats
 
 @receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        CustomerProfile.objects.get_or_create(user=instance)
-        Group.objects.get_or_create(name='Customer')
-        Group.objects.get_or_create(name='Trainer')
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    # The role groups come from migrate (accounts.signals.create_role_groups).
+    # Bulk provisioning creates profiles itself; see gym.provisioning.
+    if created and not raw:
+        CustomerProfile.objects.create(user=instance)
+
+
+SEARCHABLE_USER_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # A new user is indexed when create_profile saves their profile
+    if created and not raw:
+        return
+    # Logins save only last_login; don't rewrite the index for those
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS.intersection(update_fields):
+        return
+    search.index_users([instance.pk])
+
+
+@receiver(post_save, sender=CustomerProfile)
+def index_profile(sender, instance, **kwargs):
+    search.index_users([instance.user_id])
+
+
+@receiver(post_delete, sender=CustomerProfile)
+def unindex_profile(sender, instance, **kwargs):
+    # Rewrites the document without the profile fields; when the user is
+    # being deleted too, unindex_user runs afterwards and drops it
+    search.index_users([instance.user_id])
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    search.remove_users([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def count_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    # add() only reports the rows it actually inserts, but remove() reports
+    # whatever it was asked to remove, so removals are counted beforehand
+    # from the rows that exist. Either way the adjustment waits for commit.
+    if action == 'post_add':
+        if reverse:
+            key = stats.GROUP_COUNTERS.get(instance.name)
+            if key:
+                stats.adjust(key, len(pk_set))
+        else:
+            for name in Group.objects.filter(pk__in=pk_set).values_list('name', flat=True):
+                if name in stats.GROUP_COUNTERS:
+                    stats.adjust(stats.GROUP_COUNTERS[name], 1)
+    elif action == 'pre_remove':
+        if reverse:
+            key = stats.GROUP_COUNTERS.get(instance.name)
+            if key:
+                stats.adjust(key, -instance.user_set.filter(pk__in=pk_set).count())
+        else:
+            for name in instance.groups.filter(pk__in=pk_set).values_list('name', flat=True):
+                if name in stats.GROUP_COUNTERS:
+                    stats.adjust(stats.GROUP_COUNTERS[name], -1)
+    elif action == 'pre_clear':
+        if reverse:
+            key = stats.GROUP_COUNTERS.get(instance.name)
+            if key:
+                stats.invalidate(key)
+        else:
+            for name in instance.groups.values_list('name', flat=True):
+                if name in stats.GROUP_COUNTERS:
+                    stats.adjust(stats.GROUP_COUNTERS[name], -1)
+
+
+@receiver(pre_delete, sender=User)
+def uncount_deleted_user(sender, instance, **kwargs):
+    # Group rows are removed by the cascade, which sends no m2m_changed
+    for name in instance.groups.values_list('name', flat=True):
+        if name in stats.GROUP_COUNTERS:
+            stats.adjust(stats.GROUP_COUNTERS[name], -1)
+
+
+@receiver(post_save, sender=DietPlan)
+def count_diet_plan(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    # The previous state comes from DietPlan.from_db; a plan saved without
+    # having been loaded (or by loaddata) can't be compared, so recount
+    was_active = False if created else getattr(instance, '_loaded_active', None)
+    if raw or was_active is None:
+        stats.invalidate(stats.TOTAL_DIET_PLANS)
+    else:
+        stats.adjust(stats.TOTAL_DIET_PLANS, int(instance.is_active) - int(was_active))
+    instance._loaded_active = instance.is_active
+
+
+@receiver(post_delete, sender=DietPlan)
+def uncount_diet_plan(sender, instance, **kwargs):
+    if instance.is_active:
+        stats.adjust(stats.TOTAL_DIET_PLANS, -1)
+
+
+@receiver(post_save, sender=DietPlan)
+@receiver(post_save, sender=WorkoutPlan)
+@receiver(post_delete, sender=DietPlan)
+@receiver(post_delete, sender=WorkoutPlan)
+def expire_plan_cards(sender, instance, **kwargs):
+    fragments.bump_plans_version([instance.customer_id])
+
+
+@receiver(post_delete, sender=ProgressTracking)
+def delete_photo_variants(sender, instance, **kwargs):
+    if instance.photo_processed:
+        images.delete_variants(instance.pk)
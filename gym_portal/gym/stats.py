@@ -0,0 +1,67 @@
+# gym_portal/gym/stats.py
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.roles import CUSTOMER_GROUP, TRAINER_GROUP
+from .models import DietPlan
+
+# Landing-page counters. They are computed on a cache miss and kept current
+# between recounts by the signal handlers in gym.signals, which adjust them
+# with cache.incr/decr once the change has committed.
+TOTAL_CUSTOMERS = 'gym:stats:total_customers'
+TOTAL_TRAINERS = 'gym:stats:total_trainers'
+TOTAL_DIET_PLANS = 'gym:stats:total_diet_plans'
+
+GROUP_COUNTERS = {
+    CUSTOMER_GROUP: TOTAL_CUSTOMERS,
+    TRAINER_GROUP: TOTAL_TRAINERS,
+}
+
+# Recounted at least this often, which bounds any drift: adjustments made
+# by another process's LocMemCache, or missed by queryset.update()
+STATS_TIMEOUT = 10 * 60
+
+
+def _count(key):
+    if key == TOTAL_CUSTOMERS:
+        return User.objects.filter(groups__name=CUSTOMER_GROUP).count()
+    if key == TOTAL_TRAINERS:
+        return User.objects.filter(groups__name=TRAINER_GROUP).count()
+    return DietPlan.objects.filter(is_active=True).count()
+
+
+def get_home_stats():
+    keys = (TOTAL_CUSTOMERS, TOTAL_TRAINERS, TOTAL_DIET_PLANS)
+    values = cache.get_many(keys)
+    missing = {key: _count(key) for key in keys if key not in values}
+    if missing:
+        cache.set_many(missing, STATS_TIMEOUT)
+        values.update(missing)
+    return {
+        'total_customers': values[TOTAL_CUSTOMERS],
+        'total_trainers': values[TOTAL_TRAINERS],
+        'total_diet_plans': values[TOTAL_DIET_PLANS],
+    }
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Not cached yet; the next read will count from the database
+        pass
+
+
+# Both wait for the surrounding transaction, so a rolled-back change never
+# reaches the counters (and run at once outside one)
+def adjust(key, delta):
+    if delta:
+        transaction.on_commit(partial(_incr, key, delta))
+
+
+def invalidate(*keys):
+    keys = keys or (TOTAL_CUSTOMERS, TOTAL_TRAINERS, TOTAL_DIET_PLANS)
+    transaction.on_commit(partial(cache.delete_many, keys))
@@ -1,3 +1,1116 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image, ImageCms
+
+from accounts import roles
+
+from . import (
+    analytics, archive, benchmark, exports, fragments, images, importers, pagination, provisioning, routers, search,
+    seeding, stats, urls, views,
+)
+from .forms import BulkPlanAssignForm
+from .instrumentation import QueryBudgetTestMixin
+from .models import CustomerProfile, DietPlan, ProgressArchive, ProgressTracking, WorkoutPlan
+from .routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinningMiddleware, pinned_to_primary
+
+
+class DashboardQueryPlanTests(TestCase):
+    # Guards the composite indexes from migration 0005: each dashboard query
+    # must be answered from an index in the requested order, without SQLite
+    # falling back to a temporary B-tree sort. The plans are taken for the
+    # SQL the views actually run.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('plan_customer')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+        cls.trainer = User.objects.create_user('plan_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+
+    def assertViewUsesIndexes(self, user, url, indexes):
+        # indexes: {(table, column listed newest first): index name}
+        self.client.force_login(user)
+        cache.clear()  # plan cards from the fragment cache would skip their queries
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for (table, column), index_name in indexes.items():
+            with self.subTest(table):
+                ordering = f'ORDER BY "{table}"."{column}" DESC'
+                listed = [query['sql'] for query in queries
+                          if f'FROM "{table}"' in query['sql'] and ordering in query['sql']]
+                self.assertTrue(listed, f'the view no longer lists {table} newest first')
+                for sql in listed:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                        plan = ' '.join(row[-1] for row in cursor.fetchall())
+                    self.assertIn(index_name, plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_customer_dashboard_queries(self):
+        self.assertViewUsesIndexes(self.customer, reverse('customer_dashboard'), {
+            ('gym_dietplan', 'created_at'): 'diet_customer_active_idx',
+            ('gym_workoutplan', 'created_at'): 'workout_customer_active_idx',
+            ('gym_progresstracking', 'date'): 'progress_customer_date_idx',
+        })
+
+    def test_trainer_customer_detail_queries(self):
+        self.assertViewUsesIndexes(self.trainer, reverse('trainer_customer_detail', args=[self.customer.pk]), {
+            ('gym_dietplan', 'created_at'): 'diet_customer_created_idx',
+            ('gym_workoutplan', 'created_at'): 'workout_customer_created_idx',
+            ('gym_progresstracking', 'date'): 'progress_customer_date_idx',
+        })
+
+
+class ViewQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    # Several customers with plans and history, so a query per row (N+1)
+    # shows up as a budget overrun rather than hiding behind a single row.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('budget_trainer', first_name='Tara')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        cls.staff = User.objects.create_user('budget_staff', is_staff=True)
+        customer_group = Group.objects.get(name='Customer')
+        today = timezone.localdate()
+        cls.customers = []
+        for index in range(5):
+            customer = User.objects.create_user(f'budget_customer{index}', first_name=f'Member{index}')
+            customer.groups.add(customer_group)
+            customer.customer_profile.goal = 'lose_weight'
+            customer.customer_profile.height_cm = 175
+            customer.customer_profile.weight_kg = 80
+            customer.customer_profile.save()
+            cls.diet_plan = DietPlan.objects.create(customer=customer, trainer=cls.trainer, title='Cut')
+            cls.workout_plan = WorkoutPlan.objects.create(customer=customer, trainer=cls.trainer, title='Split')
+            ProgressTracking.objects.bulk_create(
+                # Odd-numbered customers gain weight, so they show up as off track
+                ProgressTracking(customer=customer, date=today - timedelta(days=day * 3),
+                                 weight_kg=80 + day * (0.2 if index % 2 == 0 else -0.2))
+                for day in range(12)
+            )
+            cls.customers.append(customer)
+        cls.customer = cls.customers[0]
+
+    def setUp(self):
+        # Role lookups and home counters live in the cache; start cold
+        cache.clear()
+
+    def assertPagesWithinBudget(self, user, url_names):
+        if user is not None:
+            self.client.force_login(user)
+        for url_name, args in url_names:
+            with self.subTest(url_name):
+                response = self.client.get(reverse(url_name, args=args))
+                self.assertLess(response.status_code, 400)
+                self.assertWithinQueryBudget(response)
+
+    def test_every_gym_view_has_a_budget(self):
+        for pattern in urls.urlpatterns:
+            self.assertIn(pattern.name, settings.VIEW_QUERY_BUDGETS)
+
+    def test_home(self):
+        self.assertPagesWithinBudget(None, [('home', ())])
+
+    def test_customer_views(self):
+        self.assertPagesWithinBudget(self.customer, [
+            ('customer_dashboard', ()),
+            ('customer_profile_edit', ()),
+            ('add_progress', ()),
+        ])
+
+    def test_trainer_views(self):
+        customer_id = self.customer.pk
+        self.assertPagesWithinBudget(self.trainer, [
+            ('trainer_dashboard', ()),
+            ('trainer_customers_list', ()),
+            ('trainer_customer_autocomplete', ()),
+            ('trainer_off_track_customers', ()),
+            ('trainer_customer_detail', (customer_id,)),
+            ('trainer_create_diet_plan', (customer_id,)),
+            ('trainer_create_workout_plan', (customer_id,)),
+            ('trainer_import_progress', (customer_id,)),
+            ('trainer_edit_diet_plan', (self.diet_plan.pk,)),
+            ('trainer_edit_workout_plan', (self.workout_plan.pk,)),
+            ('trainer_bulk_assign_plan', ('diet',)),
+            ('export_data', ('progress',)),
+        ])
+
+    def test_customer_search(self):
+        self.client.force_login(self.trainer)
+        response = self.client.get(reverse('trainer_customers_list'), {'search': 'member'})
+        self.assertWithinQueryBudget(response)
+        response = self.client.get(reverse('trainer_customer_autocomplete'), {'q': 'mem'})
+        self.assertWithinQueryBudget(response)
+
+    def test_add_progress_post(self):
+        self.client.force_login(self.customer)
+        response = self.client.post(reverse('add_progress'), {
+            'weight_kg': 79.5, 'date': timezone.localdate().isoformat(), 'notes': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinQueryBudget(response)
+
+    def test_edit_plan_posts(self):
+        self.client.force_login(self.trainer)
+        for url_name, plan in (('trainer_edit_diet_plan', self.diet_plan),
+                               ('trainer_edit_workout_plan', self.workout_plan)):
+            with self.subTest(url_name):
+                data = {'title': 'Updated', 'duration_weeks': 4, 'is_active': 'on'}
+                response = self.client.post(reverse(url_name, args=[plan.pk]), data)
+                self.assertEqual(response.status_code, 302)
+                self.assertWithinQueryBudget(response)
+
+    def test_bulk_assign_post(self):
+        self.client.force_login(self.trainer)
+        data = {'source_plan': self.workout_plan.pk, 'goal': 'lose_weight',
+                'customers': [self.customer.pk], 'deactivate_previous': 'on'}
+        response = self.client.post(reverse('trainer_bulk_assign_plan', args=['workout']), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinQueryBudget(response)
+
+    def test_import_progress_post(self):
+        self.client.force_login(self.trainer)
+        today = timezone.localdate()
+        # One row predates the hot horizon, which adds the archived-week check
+        days = (1, 2, settings.PROGRESS_HOT_DAYS + 14)
+        rows = ''.join(f'{today - timedelta(days=day)},{79 + day / 100}\n' for day in days)
+        upload = SimpleUploadedFile('progress.csv', f'date,weight\n{rows}'.encode())
+        response = self.client.post(reverse('trainer_import_progress', args=[self.customer.pk]), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '3 imported')
+        self.assertWithinQueryBudget(response)
+
+    def test_staff_metrics(self):
+        self.assertPagesWithinBudget(self.staff, [('instrumentation_metrics', ())])
+        response = self.client.get(reverse('instrumentation_metrics'))
+        self.assertIn('instrumentation_metrics', response.json()['views'])
+
+
+class RoleResolutionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('role_member')
+        cls.member.groups.add(Group.objects.get(name='Customer'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_role_is_cached_until_groups_change(self):
+        self.assertEqual(roles.resolve_role(self.member), roles.CUSTOMER)
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.resolve_role(self.member), roles.CUSTOMER)
+        self.member.groups.add(Group.objects.get(name='Trainer'))
+        self.assertEqual(roles.resolve_role(self.member), roles.TRAINER)
+
+    def test_views_send_the_wrong_role_to_its_own_dashboard(self):
+        trainer = User.objects.create_user('role_trainer')
+        trainer.groups.add(Group.objects.get(name='Trainer'))
+        self.client.force_login(self.member)
+        self.assertRedirects(self.client.get(reverse('trainer_dashboard')), reverse('customer_dashboard'))
+        self.client.force_login(trainer)
+        self.assertRedirects(self.client.get(reverse('customer_dashboard')), reverse('trainer_dashboard'))
+        self.assertRedirects(self.client.get(reverse('dashboard')), reverse('trainer_dashboard'))
+
+
+class HomeStatsCounterTests(TestCase):
+    # The counters are adjusted, not recounted, so each check compares the
+    # cached value against a fresh count
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers = Group.objects.get(name='Customer')
+        cls.member = User.objects.create_user('stats_member')
+        cls.member.groups.add(cls.customers)
+
+    def setUp(self):
+        cache.clear()
+        stats.get_home_stats()
+
+    def assertCounted(self):
+        self.assertEqual(cache.get(stats.TOTAL_CUSTOMERS), User.objects.filter(groups=self.customers).count())
+        self.assertEqual(cache.get(stats.TOTAL_DIET_PLANS), DietPlan.objects.filter(is_active=True).count())
+
+    def test_group_add_remove_and_delete(self):
+        other = User.objects.create_user('stats_other')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.groups.add(self.customers)
+            other.groups.add(self.customers)  # already a member
+        self.assertCounted()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customers.user_set.remove(other, User.objects.create_user('stats_never_joined'))
+        self.assertCounted()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+        self.assertCounted()
+
+    def test_rolled_back_changes_are_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                User.objects.create_user('stats_rolled_back').groups.add(self.customers)
+                DietPlan.objects.create(customer=self.member, title='Draft')
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertCounted()
+
+    def test_plan_activation_is_tracked_without_rereading(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            plan = DietPlan.objects.create(customer=self.member, title='Cut')
+        self.assertCounted()
+        plan = DietPlan.objects.get(pk=plan.pk)
+        plan.is_active = False
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            plan.save()
+        self.assertCounted()
+        with self.captureOnCommitCallbacks(execute=True):
+            plan.save(update_fields=['title'])
+            plan.is_active = True
+            plan.save()
+        self.assertCounted()
+
+
+class SQLiteProfileTests(TestCase):
+
+    def test_pragmas_applied_to_new_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size'])
+
+
+@override_settings(SQLITE_JOURNAL_MODE='wal')
+class ConcurrentWriteTests(TransactionTestCase):
+    # Members posting progress at the same moment must all commit, waiting
+    # on the write lock (busy_timeout) rather than failing with "locked"
+    writers = 8
+    writes = 10
+
+    def test_parallel_progress_posts_all_commit(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        customers = [User.objects.create_user(f'writer{index}') for index in range(self.writers)]
+        start_together = threading.Barrier(self.writers)
+        failures = []
+
+        def write(customer):
+            try:
+                client = Client()
+                client.force_login(customer)
+                start_together.wait()
+                for day in range(self.writes):
+                    response = client.post(reverse('add_progress'), {
+                        'weight_kg': 80, 'notes': '', 'date': (timezone.localdate() - timedelta(days=day)).isoformat(),
+                    })
+                    if response.status_code != 302:
+                        failures.append(response.status_code)
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=write, args=(customer,)) for customer in customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        self.assertEqual(ProgressTracking.objects.count(), self.writers * self.writes)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def setUp(self):
+        # Writes made by earlier tests leave this thread pinned to the primary
+        token = routers._pinned.set(False)
+        self.addCleanup(routers._pinned.reset, token)
+
+    def serve(self, request, write=False):
+        reads = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(ProgressTracking)
+            reads.append(self.router.db_for_read(ProgressTracking))
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(view)(request), reads[0]
+
+    def test_reads_use_replica_unless_pinned(self):
+        self.assertEqual(self.router.db_for_read(DietPlan), 'replica1')
+        with pinned_to_primary():
+            self.assertEqual(self.router.db_for_read(DietPlan), 'default')
+        self.assertEqual(self.router.db_for_write(DietPlan), 'default')
+
+    def test_sessions_stay_on_primary(self):
+        from django.contrib.sessions.models import Session
+        self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_write_pins_following_requests(self):
+        factory = RequestFactory()
+        response, db = self.serve(factory.get('/'))
+        self.assertEqual(db, 'replica1')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response, db = self.serve(factory.post('/'), write=True)
+        self.assertEqual(db, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.serve(request)[1], 'default')
+
+
+
+class PlanFragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('cards_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        cls.customer = User.objects.create_user('cards_customer')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+        cls.plan = DietPlan.objects.create(customer=cls.customer, trainer=cls.trainer, title='Lean bulk')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_view_skips_plan_queries(self):
+        self.client.force_login(self.customer)
+        self.client.get(reverse('customer_dashboard'))  # warms the role cache too
+        fragments.bump_plans_version([self.customer.pk])
+        rendered = self.client.get(reverse('customer_dashboard'))
+        cached = self.client.get(reverse('customer_dashboard'))
+        self.assertContains(cached, 'Lean bulk')
+        # The diet and workout plan queries are not run at all
+        self.assertEqual(cached.instrumentation.queries, rendered.instrumentation.queries - 2)
+
+    def test_edit_through_trainer_view_expires_cards(self):
+        self.client.force_login(self.customer)
+        self.client.get(reverse('customer_dashboard'))
+
+        self.client.force_login(self.trainer)
+        self.client.get(reverse('trainer_customer_detail', args=[self.customer.pk]))
+        response = self.client.post(reverse('trainer_edit_diet_plan', args=[self.plan.pk]), {
+            'title': 'Clean cut', 'water_intake': '3 liters', 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(reverse('trainer_customer_detail', args=[self.customer.pk])), 'Clean cut')
+
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertContains(response, 'Clean cut')
+        self.assertNotContains(response, 'Lean bulk')
+
+
+class BulkPlanAssignTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('assign_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        cls.source = WorkoutPlan.objects.create(
+            customer=User.objects.create_user('assign_source'), trainer=cls.trainer,
+            title='Push pull legs', monday='Push', duration_weeks=6,
+        )
+        customer_group = Group.objects.get(name='Customer')
+        cls.members = []
+        for index, goal in enumerate(('gain_muscle', 'gain_muscle', 'lose_weight', 'lose_weight')):
+            member = User.objects.create_user(f'assign_member{index}')
+            member.groups.add(customer_group)
+            member.customer_profile.goal = goal
+            member.customer_profile.save()
+            WorkoutPlan.objects.create(customer=member, trainer=cls.trainer, title='Old split')
+            cls.members.append(member)
+
+    def setUp(self):
+        self.client.force_login(self.trainer)
+
+    def assign(self, **data):
+        return self.client.post(reverse('trainer_bulk_assign_plan', args=['workout']), data)
+
+    def test_copies_to_goal_and_picked_customers(self):
+        picked = self.members[2]
+        response = self.assign(source_plan=self.source.pk, goal='gain_muscle', customers=[picked.pk],
+                               deactivate_previous='on')
+        self.assertRedirects(response, reverse('trainer_dashboard'))
+        active = WorkoutPlan.objects.filter(is_active=True, customer__in=self.members[:3])
+        self.assertEqual(
+            sorted(active.values_list('customer_id', 'title', 'monday', 'duration_weeks')),
+            [(member.pk, 'Push pull legs', 'Push', 6) for member in self.members[:3]],
+        )
+        self.assertTrue(self.members[3].workout_plans.get().is_active)
+
+    def test_picker_lists_the_trainers_customers_and_source_plans(self):
+        stranger = User.objects.create_user('assign_stranger')
+        stranger.groups.add(Group.objects.get(name='Customer'))
+        self.assign(source_plan=self.source.pk, customers=[self.members[0].pk])
+        url = reverse('trainer_bulk_assign_plan', args=['workout'])
+
+        form = self.client.get(url).context['form']
+        listed = [value for value, _ in form.fields['customers'].widget.choices]
+        self.assertEqual(sorted(listed), sorted(member.pk for member in self.members))
+        # The copy just made is not offered as a source
+        self.assertNotIn(WorkoutPlan.objects.get(copied_from=self.source), form.fields['source_plan'].queryset)
+        self.assertIn(self.source, form.fields['source_plan'].queryset)
+
+        form = self.client.get(url, {'q': 'member3'}).context['form']
+        self.assertEqual([value for value, _ in form.fields['customers'].widget.choices], [self.members[3].pk])
+        with mock.patch.object(BulkPlanAssignForm, 'CUSTOMER_CHOICES_LIMIT', 2):
+            form = self.client.get(url).context['form']
+            self.assertEqual(len(list(form.fields['customers'].widget.choices)), 2)
+
+    def test_source_must_be_the_trainers_own_plan(self):
+        other = User.objects.create_user('assign_other_trainer')
+        plan = WorkoutPlan.objects.create(customer=self.members[0], trainer=other, title='Not yours')
+        plans = WorkoutPlan.objects.count()
+        response = self.assign(source_plan=plan.pk, goal='gain_muscle')
+        self.assertIn('source_plan', response.context['form'].errors)
+        self.assertEqual(self.assign(source_plan=self.source.pk).context['form'].non_field_errors(),
+                         ['Select customers or a goal to assign the plan to.'])
+        self.assertEqual(WorkoutPlan.objects.count(), plans)
+
+
+class StoredBmiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        customer_group = Group.objects.get(name='Customer')
+        cls.profiles = {}
+        for name, weight in (('lean', 60), ('heavy', 110)):
+            member = User.objects.create_user(f'bmi_{name}')
+            member.groups.add(customer_group)
+            profile = member.customer_profile
+            profile.height_cm, profile.weight_kg = 180, weight
+            profile.save()
+            cls.profiles[name] = profile
+
+    def test_columns_follow_weight_and_height(self):
+        profile = self.profiles['lean']
+        self.assertEqual((profile.bmi, profile.bmi_category), (18.52, 'Normal weight'))
+        profile.weight_kg = 55
+        profile.save(update_fields=['weight_kg'])
+        profile.refresh_from_db()
+        self.assertEqual((profile.bmi, profile.bmi_category), (16.98, 'Underweight'))
+
+    def test_migration_backfills_existing_rows(self):
+        backfill = import_module('gym.migrations.0004_customerprofile_stored_bmi').backfill_bmi
+        CustomerProfile.objects.update(bmi=None, bmi_category='Unknown')
+        backfill(django_apps, None)
+        profiles = CustomerProfile.objects.filter(user__username__startswith='bmi_')
+        self.assertEqual(dict(profiles.values_list('user__username', 'bmi')), {'bmi_lean': 18.52, 'bmi_heavy': 33.95})
+
+    def test_customer_list_filters_by_category_in_sql(self):
+        trainer = User.objects.create_user('bmi_trainer')
+        trainer.groups.add(Group.objects.get(name='Trainer'))
+        self.client.force_login(trainer)
+        response = self.client.get(reverse('trainer_customers_list'), {'bmi': 'Obese'})
+        self.assertEqual([user.pk for user in response.context['customers']], [self.profiles['heavy'].user_id])
+        response = self.client.get(reverse('trainer_customers_list'), {'bmi': 'Giant'})
+        self.assertEqual(response.context['bmi_filter'], '')
+        self.assertEqual(len(response.context['customers']), 2)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Ties on first_name, so the id tie-breaker decides the order
+        for index, name in enumerate(['Asha', 'Asha', 'Asha', 'Bala', 'Chen']):
+            User.objects.create_user(f'keyset{index}', first_name=name)
+        cls.users = User.objects.filter(username__startswith='keyset')
+        cls.expected = list(cls.users.order_by('first_name', 'id').values_list('id', flat=True))
+
+    def page(self, **cursors):
+        return pagination.keyset_paginate(self.users, ('first_name', 'id'), 2, **cursors)
+
+    def test_next_and_previous_walk_every_row_once(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(after=pages[-1].next_cursor))
+        self.assertEqual([user.id for page in pages for user in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = self.page(before=pages[-1].previous_cursor)
+        self.assertEqual([user.id for user in back], [user.id for user in pages[-2]])
+        self.assertEqual([user.id for user in self.page(before=back.previous_cursor)], self.expected[:2])
+
+    def test_tampered_cursors_restart_from_the_first_page(self):
+        for values in (['Asha', 'x'], ['Asha'], [['Asha'], 1], ['Asha', 10 ** 30], None):
+            cursor = pagination.encode_cursor(values) if values is not None else 'not base64!'
+            with self.subTest(values=values):
+                self.assertEqual([user.id for user in self.page(after=cursor)], self.expected[:2])
+        bad_date = pagination.encode_cursor(['2024-99-99', 1])
+        page = pagination.keyset_paginate(ProgressTracking.objects.all(), ('date', 'id'), 2, after=bad_date)
+        self.assertFalse(page.has_previous)
+
+    def test_customer_list_ignores_a_bad_cursor(self):
+        trainer = User.objects.create_user('keyset_trainer')
+        trainer.groups.add(Group.objects.get(name='Trainer'))
+        self.client.force_login(trainer)
+        response = self.client.get(reverse('trainer_customers_list'), {'after': pagination.encode_cursor(['a', 'x'])})
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(search.is_available(), 'the full-text index needs SQLite')
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user('search_customer', last_name='Menon')
+        self.customer.groups.add(Group.objects.get(name='Customer'))
+
+    def test_limit_counts_only_rows_in_the_queryset(self):
+        # Trainers whose username matches too outrank the customer
+        for index in range(3):
+            User.objects.create_user(f'menon_trainer{index}', last_name='Menon')
+        customers = User.objects.filter(groups__name='Customer')
+        self.assertEqual(search.search_customers(customers, 'menon', limit=2), [self.customer])
+        # Fetched one ranked id at a time, the trainers take three rounds
+        with mock.patch.object(search, 'SEARCH_OVERFETCH', 1):
+            annotated = customers.annotate(plans=Count('diet_plans'))
+            self.assertEqual(search.search_customers(annotated, 'menon', limit=1, members=customers), [self.customer])
+
+    def test_index_follows_user_and_profile_changes(self):
+        self.customer.last_name = 'Iyer'
+        self.customer.save()
+        self.assertEqual(search.search_user_ids('menon'), [])
+        self.assertEqual(search.search_user_ids('iyer'), [self.customer.pk])
+
+        profile = self.customer.customer_profile
+        profile.diseases = 'asthma'
+        profile.save()
+        self.assertEqual(search.search_user_ids('asthma'), [self.customer.pk])
+        profile.delete()
+        self.assertEqual(search.search_user_ids('asthma'), [])
+        self.assertEqual(search.search_user_ids('iyer'), [self.customer.pk])
+
+        self.customer.delete()
+        self.assertEqual(search.search_user_ids('iyer'), [])
+
+
+class ExportDataTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('export_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        customer = User.objects.create_user('export_customer')
+        ProgressTracking.objects.create(customer=customer, date='2024-03-01', weight_kg=80)
+        ProgressTracking.objects.create(customer=customer, date='2024-04-01', weight_kg=79)
+
+    def export(self, **params):
+        self.client.force_login(self.trainer)
+        return self.client.get(reverse('export_data', args=['progress']), params)
+
+    def test_date_range(self):
+        response = self.export(start='2024-03-15', format='jsonl')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['date'] for line in lines], ['2024-04-01'])
+
+    def test_bad_filters_are_rejected(self):
+        for params in ({'start': '2024-13-45'}, {'end': 'yesterday'}, {'customer': 'x'}):
+            with self.subTest(**params):
+                self.assertEqual(self.export(**params).status_code, 400)
+
+
+class ProgressImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('import_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        cls.customer = User.objects.create_user('import_customer')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+
+    def upload(self, name, content):
+        self.client.force_login(self.trainer)
+        return self.client.post(reverse('trainer_import_progress', args=[self.customer.pk]), {
+            'file': SimpleUploadedFile(name, content),
+        })
+
+    def test_rows_are_imported_and_bad_ones_reported(self):
+        response = self.upload('scale.json', b'[{"date": "2024-03-01", "weight": 80.5}, {"date": 1e20, "weight": 80}]')
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual((report.created, report.error_count), (1, 1))
+        self.assertIn('out of range', report.errors[0][1])
+
+    def test_undecodable_file_is_a_form_error(self):
+        response = self.upload('scale.csv', 'date,weight,notes\n2024-03-01,80,Caf\xe9 visit\n'.encode('latin-1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not UTF-8', response.context['form'].errors['file'][0])
+        self.assertFalse(self.customer.progress_records.exists())
+
+
+class ProvisioningTests(TestCase):
+
+    def test_members_get_profile_group_and_search_entry(self):
+        User.objects.create_user('taken_member')
+        groups = Group.objects.count()
+        report = provisioning.provision_members(enumerate([
+            {'username': 'bulk_ravi', 'last_name': 'Menon', 'password': 'bulk-pass-123',
+             'weight_kg': '80', 'height_cm': '180', 'goal': 'lose_weight'},
+            {'username': 'bulk_coach', 'role': 'trainer', 'password_hash': make_password('coach-pass-123')},
+            {'username': 'taken_member'},
+            {'username': 'bulk_odd', 'goal': 'fly'},
+        ], start=1), batch_size=2)
+
+        self.assertEqual((report.created, report.existing, report.error_count), (2, 1, 1))
+        self.assertEqual(Group.objects.count(), groups)
+        member = User.objects.get(username='bulk_ravi')
+        self.assertTrue(member.check_password('bulk-pass-123'))
+        self.assertTrue(member.groups.filter(name='Customer').exists())
+        self.assertEqual(member.customer_profile.bmi_category, 'Normal weight')
+        self.assertTrue(User.objects.get(username='bulk_coach').groups.filter(name='Trainer').exists())
+        if search.is_available():
+            self.assertIn(member.pk, search.search_user_ids('menon'))
+
+
+class SeedingTests(TestCase):
+
+    def setUp(self):
+        # The benchmark fixture saves a progress photo and logs in repeatedly
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, AUTH_THROTTLE_RATES={}))
+        cache.clear()
+
+    def test_seeded_portal_and_benchmark_report(self):
+        report = seeding.seed_portal(trainers=2, customers=4, years=0.1, plans_per_customer=2, seed=1)
+        self.assertEqual((report.trainers, report.customers, report.plans), (2, 4, 16))
+        self.assertEqual(User.objects.filter(username__startswith='seed_trainer_', groups__name='Trainer').count(), 2)
+        customers = User.objects.filter(username__startswith='seed_customer_', groups__name='Customer')
+        self.assertEqual(CustomerProfile.objects.filter(user__in=customers).count(), 4)
+        self.assertEqual((DietPlan.objects.count(), WorkoutPlan.objects.count()), (8, 8))
+        self.assertEqual(DietPlan.objects.filter(is_active=True).count(), 4)
+        self.assertEqual(ProgressTracking.objects.count(), report.progress)
+        self.assertGreaterEqual(report.progress, 4 * 9)  # 36 days, a weigh-in every 1-4 days
+
+        self.assertEqual(benchmark.missing_url_names(), [])
+        results = benchmark.run_benchmark(benchmark.Fixture(), iterations=2, warmup=0)
+        self.assertEqual(list(results), [scenario[0] for scenario in benchmark.SCENARIOS])
+        for label, result in results.items():
+            with self.subTest(label):
+                self.assertEqual(set(result), {'p50_ms', 'p95_ms', 'queries'})
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+        baseline = {'4': results}
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
+        more_queries = dict(results['home'], queries=results['home']['queries'] + 1)
+        self.assertEqual(benchmark.compare({'4': {'home': more_queries}}, baseline), [
+            ('4', 'home', f'queries {results["home"]["queries"]} -> {more_queries["queries"]}'),
+        ])
+
+
+class WeightTrendTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        customer_group = Group.objects.get(name='Customer')
+        cls.members = {}
+        # Weekly weigh-ins over eight weeks, in kg/week
+        for name, goal, rate in (('losing', 'lose_weight', -0.5), ('gaining', 'lose_weight', 0.4),
+                                 ('steady', 'maintain', 0.0)):
+            member = User.objects.create_user(f'trend_{name}')
+            member.groups.add(customer_group)
+            member.customer_profile.goal = goal
+            member.customer_profile.save()
+            ProgressTracking.objects.bulk_create(
+                ProgressTracking(customer=member, date=today - timedelta(weeks=week), weight_kg=80 - rate * week)
+                for week in range(8)
+            )
+            cls.members[name] = member
+
+    def test_series_helpers(self):
+        days = np.array([0, 1, 2, 10])
+        weights = np.array([80.0, 79.0, 78.0, 70.0])
+        self.assertEqual(analytics.moving_average(days, weights, window_days=3).tolist(), [80, 79.5, 79, 70])
+        slope, intercept = analytics.linear_fit(days[:3], weights[:3])
+        self.assertAlmostEqual(slope, -1)
+        self.assertAlmostEqual(intercept, 80)
+        self.assertEqual(analytics.theil_sen_slope(np.array([0, 1, 2, 3]), np.array([80.0, 79.0, 95.0, 77.0])), -1)
+
+    def test_customer_trend(self):
+        trend = analytics.customer_trend(self.members['losing'])
+        self.assertEqual((trend['samples'], trend['weekly_rate'], trend['projected_weight']), (8, -0.5, 78.0))
+        self.assertFalse(trend['off_track'])
+        steady = analytics.customer_trend(self.members['steady'])
+        self.assertTrue(steady['plateau'])
+        self.assertFalse(steady['off_track'])
+
+    def test_bulk_scores_match_the_single_customer_fit(self):
+        scores = analytics.score_customers(Q(customer__groups__name='Customer'))
+        self.assertEqual([score['customer_id'] for score in scores], [self.members['gaining'].pk])
+        self.assertEqual(scores[0]['weekly_rate'], analytics.customer_trend(self.members['gaining'])['weekly_rate'])
+
+        trainer = User.objects.create_user('trend_trainer')
+        trainer.groups.add(Group.objects.get(name='Trainer'))
+        self.client.force_login(trainer)
+        response = self.client.get(reverse('trainer_off_track_customers'))
+        self.assertEqual([row['customer'] for row in response.context['rows']], [self.members['gaining']])
+
+
+class ProgressArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('archive_customer')
+        self.cutoff = archive.archive_cutoff()
+        self.old_week = self.cutoff - timedelta(days=14)  # a Monday
+        ProgressTracking.objects.bulk_create([
+            ProgressTracking(customer=self.customer, date=self.old_week + timedelta(days=day), weight_kg=weight)
+            for day, weight in ((0, 90), (2, 89), (4, 88))
+        ] + [
+            ProgressTracking(customer=self.customer, date=self.old_week, weight_kg=91,
+                             photo='progress_photos/kept.jpg'),
+            ProgressTracking(customer=self.customer, date=timezone.localdate(), weight_kg=80),
+        ])
+
+    def test_old_records_become_weekly_summaries(self):
+        self.assertEqual(archive.archive_progress(), (3, 1))
+        week = ProgressArchive.objects.get(customer=self.customer)
+        mean_date = self.old_week + timedelta(days=2)
+        self.assertEqual((week.week_start, week.date, week.samples), (self.old_week, mean_date, 3))
+        self.assertEqual((week.weight_kg, week.weight_min_kg, week.weight_max_kg), (89, 88, 90))
+        # The photo record and the recent one stay hot
+        self.assertEqual(self.customer.progress_records.count(), 2)
+
+        # A record back-dated into the archived week is merged into it
+        ProgressTracking.objects.create(customer=self.customer, date=self.old_week + timedelta(days=6), weight_kg=87)
+        self.assertEqual(archive.archive_progress(), (1, 1))
+        week.refresh_from_db()
+        self.assertEqual((week.samples, week.weight_kg, week.weight_min_kg), (4, 88.5, 87))
+
+    def test_readers_see_archived_and_hot_records(self):
+        archive.archive_progress()
+        _, days, weights = analytics.load_series(Q(customer=self.customer))
+        self.assertEqual(weights.tolist(), [91, 89, 80])
+        self.assertEqual(analytics.load_series(Q(customer=self.customer), since=self.cutoff)[2].tolist(), [80])
+
+        rows = list(exports.export_queryset('progress', customer_id=self.customer.pk).iterator(chunk_size=100))
+        self.assertEqual(len(rows), 3)
+        mean_date = self.old_week + timedelta(days=2)
+        self.assertEqual(rows[0][:5], (None, self.customer.pk, 'archive_customer', mean_date, 89))
+        self.assertIn('3 archived weigh-in(s)', rows[0][5])
+
+    def test_bulk_scores_include_archived_weeks(self):
+        archive.archive_progress()
+        self.customer.customer_profile.goal = 'gain_muscle'
+        self.customer.customer_profile.save()
+        window_days = settings.PROGRESS_HOT_DAYS + 60
+        scores = analytics.score_customers(Q(customer=self.customer), window_days=window_days)
+        trend = analytics.customer_trend(self.customer, window_days=window_days)
+        self.assertEqual(trend['samples'], 3)
+        self.assertEqual([score['weekly_rate'] for score in scores], [trend['weekly_rate']])
+
+    def test_import_turns_away_rows_in_archived_weeks(self):
+        archive.archive_progress()
+        earlier_week = self.old_week - timedelta(days=7)
+        report = importers.import_progress([
+            (2, {'date': str(self.old_week), 'weight': '90'}),  # already counted in the archive
+            (3, {'date': str(earlier_week), 'weight': '92'}),
+            (4, {'date': str(timezone.localdate() - timedelta(days=1)), 'weight': '80'}),
+        ], customer=self.customer)
+        self.assertEqual((report.created, report.error_count), (2, 1))
+        self.assertEqual(report.errors, [(2, f'the week of {self.old_week} is already archived')])
+
+        self.assertEqual(archive.archive_progress(), (1, 1))
+        self.assertEqual(ProgressArchive.objects.get(customer=self.customer, week_start=self.old_week).samples, 3)
+
+
+class StaticAssetTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_asset_served_precompressed_and_immutable(self):
+        url = static('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn(b'.cb-slideshow', gzip.decompress(b''.join(response.streaming_content)))
+
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+        revalidated = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_unhashed_name_gets_short_cache(self):
+        response = self.client.get('/static/css/style.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_compressed_file_by_name_is_not_typed_as_css(self):
+        response = self.client.get(static('css/style.css') + '.gz', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'.cb-slideshow', gzip.decompress(b''.join(response.streaming_content)))
+
+
+class ProgressPhotoTests(QueryBudgetTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        cls.customer = User.objects.create_user('photo_customer')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+        cls.other = User.objects.create_user('photo_other')
+        cls.other.groups.add(Group.objects.get(name='Customer'))
+        cls.trainer = User.objects.create_user('photo_trainer')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), (200, 80, 40)).save(buffer, 'JPEG')
+        cls.record = ProgressTracking.objects.create(
+            customer=cls.customer, weight_kg=72, photo=SimpleUploadedFile('front.jpg', buffer.getvalue()),
+        )
+        images.process_progress_photo(cls.record.pk)
+        cls.record.refresh_from_db()
+
+    def test_owner_and_trainers_only(self):
+        url = self.record.thumb_webp_url
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        for user in (self.customer, self.trainer):
+            self.client.force_login(user)
+            response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'image/webp')
+            self.assertWithinQueryBudget(response)
+
+    def test_range_and_conditional_requests(self):
+        self.client.force_login(self.customer)
+        url = self.record.medium_jpg_url
+        full = self.client.get(url)
+        size = int(full['Content-Length'])
+        partial = self.client.get(url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 10-19/{size}')
+        self.assertEqual(len(b''.join(partial.streaming_content)), 10)
+        self.assertEqual(self.client.get(url, headers={'Range': f'bytes={size}-'}).status_code, 416)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': full['ETag']}).status_code, 304)
+
+    def upload(self, image, **options):
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', **options)
+        record = ProgressTracking.objects.create(
+            customer=self.customer, weight_kg=72, photo=SimpleUploadedFile('side.jpg', buffer.getvalue()),
+        )
+        images.process_progress_photo(record.pk)
+        record.refresh_from_db()
+        return buffer.getvalue(), record
+
+    def test_original_without_exif_is_kept_as_uploaded(self):
+        uploaded, record = self.upload(Image.new('RGB', (64, 48), (200, 80, 40)), quality=98)
+        with record.photo.open('rb') as fh:
+            self.assertEqual(fh.read(), uploaded)
+
+    def test_exif_is_stripped_and_orientation_baked_in(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        icc = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        _, record = self.upload(Image.new('RGB', (64, 48), (200, 80, 40)), exif=exif, icc_profile=icc)
+        with record.photo.open('rb') as fh:
+            original = Image.open(fh)
+            original.load()
+        self.assertEqual(original.size, (48, 64))
+        self.assertFalse(original.getexif())
+        self.assertEqual(original.info.get('icc_profile'), icc)
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_hand_off_to_web_server(self):
+        self.client.force_login(self.customer)
+        response = self.client.get(self.record.thumb_jpg_url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-media/progress_photos/variants/{self.record.pk}/thumb.jpg')
+        self.assertEqual(response.content, b'')
+
+
+class MemberApiTests(QueryBudgetTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('api_trainer', first_name='Tara')
+        cls.trainer.groups.add(Group.objects.get(name='Trainer'))
+        cls.customer = User.objects.create_user('api_customer')
+        cls.customer.groups.add(Group.objects.get(name='Customer'))
+        cls.plan = DietPlan.objects.create(customer=cls.customer, trainer=cls.trainer, title='Lean bulk')
+        start = timezone.localdate() - timedelta(days=30)
+        for day in range(5):
+            ProgressTracking.objects.create(customer=cls.customer, date=start + timedelta(days=day), weight_kg=80 - day)
+
+    def setUp(self):
+        self.client.force_login(self.customer)
+
+    def test_anonymous_and_trainers_get_json_errors(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_v1_profile')).status_code, 401)
+        self.client.force_login(self.trainer)
+        self.assertEqual(self.client.get(reverse('api_v1_profile')).json()['error'], 'Only members have this API.')
+
+    def test_unchanged_data_is_not_modified_until_a_plan_changes(self):
+        url = reverse('api_v1_plans')
+        response = self.client.get(url, {'fields': 'title,trainer'})
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(response.json()['diet_plans'], [{'title': 'Lean bulk', 'trainer': 'Tara'}])
+        etag = response['ETag']
+        response = self.client.get(url, {'fields': 'title,trainer'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.plan.title = 'Clean cut'
+        self.plan.save()
+        response = self.client.get(url, {'fields': 'title,trainer'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.json()['diet_plans'][0]['title'], 'Clean cut')
+
+    def test_renaming_the_trainer_changes_the_etag(self):
+        url = reverse('api_v1_plans')
+        etag = self.client.get(url)['ETag']
+        self.trainer.first_name = 'Tanvi'
+        self.trainer.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.json()['diet_plans'][0]['trainer'], 'Tanvi')
+
+    def test_lists_without_last_modified_see_deletions(self):
+        extra = DietPlan.objects.create(customer=self.customer, trainer=self.trainer, title='Extra')
+        for url in (reverse('api_v1_plans'), reverse('api_v1_progress')):
+            with self.subTest(url):
+                self.assertNotIn('Last-Modified', self.client.get(url))
+        extra.delete()
+        response = self.client.get(reverse('api_v1_plans'), headers={
+            'If-Modified-Since': http_date(timezone.now().timestamp() + 60),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['diet_plans']), 1)
+
+    def test_renaming_the_member_is_seen_despite_if_modified_since(self):
+        url = reverse('api_v1_profile')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.customer.first_name = 'Ana'
+        self.customer.save()
+        response = self.client.get(url, headers={'If-Modified-Since': http_date(timezone.now().timestamp() + 60)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Ana')
+
+    def test_tampered_progress_cursor_restarts_from_the_first_page(self):
+        url = reverse('api_v1_progress')
+        first = self.client.get(url, {'fields': 'weight_kg', 'limit': 2}).json()
+        for cursor in (pagination.encode_cursor(['2024-99-99', 1]), pagination.encode_cursor(['a', 'x'])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'fields': 'weight_kg', 'limit': 2, 'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['results'], first['results'])
+
+    def test_progress_pages_newest_first(self):
+        response = self.client.get(reverse('api_v1_progress'), {'fields': 'weight_kg', 'limit': 3})
+        self.assertWithinQueryBudget(response)
+        first = response.json()
+        self.assertEqual(first['results'], [{'weight_kg': 76}, {'weight_kg': 77}, {'weight_kg': 78}])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'], [{'weight_kg': 79}, {'weight_kg': 80}])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(second['previous']).json()['results'], first['results'])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_v1_profile'), {'fields': 'bmi,password'})
+        self.assertEqual(response.status_code, 400)
+
+
+# The async dashboards in front of the regular URLconf, as gym.urls wires
+# them up under ASGI
+urlpatterns = [
+    path('gym/customer/dashboard/', views.customer_dashboard_async, name='customer_dashboard'),
+    path('gym/trainer/customer/<int:user_id>/', views.trainer_customer_detail_async,
+         name='trainer_customer_detail'),
+    path('', include('gym_portal.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF='gym.tests')
+class AsyncDashboardTests(QueryBudgetTestMixin, TransactionTestCase):
+    # Transactional, because the concurrent queries use their own connections
+    # and would not see data inside a TestCase transaction
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = User.objects.create_user('async_trainer')
+        self.trainer.groups.add(Group.objects.get(name='Trainer'))
+        self.customer = User.objects.create_user('async_customer')
+        self.customer.groups.add(Group.objects.get(name='Customer'))
+        DietPlan.objects.create(customer=self.customer, trainer=self.trainer, title='Async cut')
+        WorkoutPlan.objects.create(customer=self.customer, trainer=self.trainer, title='Async split')
+        ProgressTracking.objects.create(customer=self.customer, weight_kg=81.5)
+
+    async def test_customer_dashboard(self):
+        await self.async_client.aforce_login(self.customer)
+        response = await self.async_client.get(reverse('customer_dashboard'))
+        self.assertContains(response, 'Async cut')
+        self.assertContains(response, 'Async split')
+        self.assertContains(response, '81.5')
+        self.assertWithinQueryBudget(response)
+
+    async def test_cached_plan_cards_skip_plan_queries(self):
+        await self.async_client.aforce_login(self.customer)
+        rendered = await self.async_client.get(reverse('customer_dashboard'))
+        cached = await self.async_client.get(reverse('customer_dashboard'))
+        self.assertContains(cached, 'Async cut')
+        # One fewer for the role lookup, now cached, and two for the plans
+        self.assertEqual(cached.instrumentation.queries, rendered.instrumentation.queries - 3)
+
+    async def test_trainer_customer_detail(self):
+        await self.async_client.aforce_login(self.trainer)
+        response = await self.async_client.get(reverse('trainer_customer_detail', args=[self.customer.pk]))
+        self.assertContains(response, 'Async cut')
+        self.assertWithinQueryBudget(response)
+        response = await self.async_client.get(reverse('trainer_customer_detail', args=[self.trainer.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_role_check(self):
+        await self.async_client.aforce_login(self.trainer)
+        response = await self.async_client.get(reverse('customer_dashboard'))
+        self.assertRedirects(response, reverse('trainer_dashboard'), fetch_redirect_response=False)
@@ -1,23 +1,46 @@
 # gym_portal/gym/urls.py
+from django.conf import settings
 from django.urls import path
+from . import api
 from .views import (
-    customer_dashboard, customer_profile_edit, add_progress,
-    trainer_dashboard, trainer_customers_list, trainer_customer_detail,
-    trainer_create_diet_plan, trainer_create_workout_plan,
-    trainer_edit_diet_plan, trainer_edit_workout_plan
+    customer_dashboard, customer_dashboard_async, customer_profile_edit, add_progress, progress_photo,
+    trainer_dashboard, trainer_customers_list, trainer_customer_autocomplete,
+    trainer_off_track_customers, trainer_customer_detail, trainer_customer_detail_async,
+    trainer_create_diet_plan, trainer_create_workout_plan, trainer_import_progress,
+    trainer_edit_diet_plan, trainer_edit_workout_plan, trainer_bulk_assign_plan,
+    export_data, instrumentation_metrics
 )
 
+# Under ASGI the dashboards that make several independent queries are served
+# by their async versions; WSGI keeps the sync ones.
+if settings.ASYNC_VIEWS:
+    customer_dashboard = customer_dashboard_async
+    trainer_customer_detail = trainer_customer_detail_async
+
 urlpatterns = [
     path('customer/dashboard/', customer_dashboard, name='customer_dashboard'),
     path('customer/profile/edit/', customer_profile_edit, name='customer_profile_edit'),
     path('customer/progress/add/', add_progress, name='add_progress'),
+    path('progress/<int:record_id>/photo/<str:variant>/', progress_photo, name='progress_photo'),
 
     path('trainer/dashboard/', trainer_dashboard, name='trainer_dashboard'),
     path('trainer/customers/', trainer_customers_list, name='trainer_customers_list'),
+    path('trainer/customers/autocomplete/', trainer_customer_autocomplete, name='trainer_customer_autocomplete'),
+    path('trainer/customers/off-track/', trainer_off_track_customers, name='trainer_off_track_customers'),
     path('trainer/customer/<int:user_id>/', trainer_customer_detail, name='trainer_customer_detail'),
     path('trainer/customer/<int:user_id>/diet/create/', trainer_create_diet_plan, name='trainer_create_diet_plan'),
     path('trainer/customer/<int:user_id>/workout/create/', trainer_create_workout_plan,
          name='trainer_create_workout_plan'),
+    path('trainer/customer/<int:user_id>/progress/import/', trainer_import_progress, name='trainer_import_progress'),
     path('trainer/diet/<int:plan_id>/edit/', trainer_edit_diet_plan, name='trainer_edit_diet_plan'),
     path('trainer/workout/<int:plan_id>/edit/', trainer_edit_workout_plan, name='trainer_edit_workout_plan'),
+    path('trainer/plans/<str:plan_type>/bulk-assign/', trainer_bulk_assign_plan, name='trainer_bulk_assign_plan'),
+
+    path('export/<str:dataset>/', export_data, name='export_data'),
+
+    path('api/v1/profile/', api.profile, name='api_v1_profile'),
+    path('api/v1/plans/', api.active_plans, name='api_v1_plans'),
+    path('api/v1/progress/', api.progress, name='api_v1_progress'),
+
+    path('staff/metrics/', instrumentation_metrics, name='instrumentation_metrics'),
 ]
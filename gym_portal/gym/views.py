@@ -1,33 +1,50 @@
 # gym_portal/gym/views.py
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
-from .models import CustomerProfile, DietPlan, WorkoutPlan, ProgressTracking
-from .forms import CustomerProfileForm, DietPlanForm, WorkoutPlanForm, ProgressTrackingForm
+from django.db.models import Count, Q
+from django.utils import timezone
+from accounts.decorators import customer_required, trainer_required
+from accounts import throttling
+from accounts.roles import TRAINER
+from .models import BMI_CATEGORY_CHOICES, CustomerProfile, DietPlan, WorkoutPlan, ProgressTracking
+from .forms import (
+    BulkPlanAssignForm, CustomerProfileForm, DietPlanForm, ExportFilterForm, WorkoutPlanForm, ProgressImportForm,
+    ProgressTrackingForm,
+)
+from .pagination import KeysetPage, keyset_paginate
+from .concurrency import run_concurrently
+from . import analytics, exports, fragments, images, importers, instrumentation, media, plans, search, stats
+
+CUSTOMERS_PAGE_SIZE = 24
+OFF_TRACK_LIMIT = 50
+
+PLAN_MODELS = {
+    'diet': DietPlan,
+    'workout': WorkoutPlan,
+}
+SEARCH_RESULTS_LIMIT = 50
+AUTOCOMPLETE_LIMIT = 10
+# Variants never change once written; the original is rewritten once when
+# it is processed, so it is revalidated until then
+PROCESSED_PHOTO_CACHE_CONTROL = 'private, max-age=3600'
 
 
 def home(request):
-    total_customers = User.objects.filter(groups__name='Customer').count()
-    total_trainers = User.objects.filter(groups__name='Trainer').count()
-    total_diet_plans = DietPlan.objects.filter(is_active=True).count()
-    context = {
-        'total_customers': total_customers,
-        'total_trainers': total_trainers,
-        'total_diet_plans': total_diet_plans,
-    }
+    context = stats.get_home_stats()
     return render(request, 'home.html', context)
 
 
 @login_required
+@customer_required
 def customer_dashboard(request):
-    if request.user.groups.filter(name='Trainer').exists():
-        return redirect('trainer_dashboard')
-
     profile = request.user.customer_profile
-    diet_plans = request.user.diet_plans.filter(is_active=True)
-    workout_plans = request.user.workout_plans.filter(is_active=True)
+    diet_plans = request.user.diet_plans.filter(is_active=True).select_related('trainer')
+    workout_plans = request.user.workout_plans.filter(is_active=True).select_related('trainer')
     recent_progress = request.user.progress_records.all()[:5]
 
     context = {
@@ -35,16 +52,48 @@ def customer_dashboard(request):
         'diet_plans': diet_plans,
         'workout_plans': workout_plans,
         'recent_progress': recent_progress,
+        # The plan querysets are only evaluated if the cached cards are stale
+        **fragments.plan_context(request.user.pk),
     }
     return render(request, 'gym/customer_dashboard.html', context)
 
 
+# ASGI counterpart of customer_dashboard (see gym.urls): the four queries run
+# concurrently, so the page waits for the slowest one rather than their sum.
 @login_required
-def customer_profile_edit(request):
-    if request.user.groups.filter(name='Trainer').exists():
-        messages.error(request, 'Trainers cannot edit customer profiles.')
-        return redirect('trainer_dashboard')
+@customer_required
+async def customer_dashboard_async(request):
+    user = request.user
+    plan_context = await sync_to_async(fragments.plan_context)(user.pk)
+    diet_plans = user.diet_plans.filter(is_active=True).select_related('trainer')
+    workout_plans = user.workout_plans.filter(is_active=True).select_related('trainer')
+    queries = [
+        lambda: CustomerProfile.objects.get(user=user),
+        lambda: list(user.progress_records.all()[:5]),
+    ]
+    # With the plan cards cached the querysets stay lazy and go unused
+    plans_cached = await sync_to_async(fragments.plan_cards_cached)(
+        fragments.CUSTOMER_PLAN_CARDS, user.pk, plan_context['plans_version']
+    )
+    if not plans_cached:
+        queries += [lambda: list(diet_plans), lambda: list(workout_plans)]
+    profile, recent_progress, *plan_lists = await run_concurrently(*queries)
+    if plan_lists:
+        diet_plans, workout_plans = plan_lists
 
+    context = {
+        'profile': profile,
+        'diet_plans': diet_plans,
+        'workout_plans': workout_plans,
+        'recent_progress': recent_progress,
+        **plan_context,
+    }
+    return await sync_to_async(render)(request, 'gym/customer_dashboard.html', context)
+
+
+@login_required
+@customer_required(message='Trainers cannot edit customer profiles.')
+def customer_profile_edit(request):
     profile = request.user.customer_profile
     if request.method == 'POST':
         form = CustomerProfileForm(request.POST, instance=profile)
@@ -58,17 +107,16 @@ def customer_profile_edit(request):
 
 
 @login_required
+@customer_required(message='Only customers can add progress records.')
 def add_progress(request):
-    if request.user.groups.filter(name='Trainer').exists():
-        messages.error(request, 'Only customers can add progress records.')
-        return redirect('trainer_dashboard')
-
     if request.method == 'POST':
         form = ProgressTrackingForm(request.POST, request.FILES)
         if form.is_valid():
             progress = form.save(commit=False)
             progress.customer = request.user
             progress.save()
+            if progress.photo:
+                images.process_progress_photo.delay(progress.pk)
             messages.success(request, 'Progress record added successfully!')
             return redirect('customer_dashboard')
     else:
@@ -77,12 +125,36 @@ def add_progress(request):
 
 
 @login_required
-def trainer_dashboard(request):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
+def progress_photo(request, record_id, variant):
+    if variant == images.ORIGINAL:
+        size = ext = None
+    else:
+        size, _, ext = variant.partition('.')
+        if size not in images.VARIANT_SIZES or ext not in images.VARIANT_FORMATS:
+            raise Http404('Unknown photo size')
+    record = get_object_or_404(
+        ProgressTracking.objects.only('customer_id', 'photo', 'photo_processed'), pk=record_id
+    )
+    # 404 rather than 403, so other members' record ids can't be probed
+    if not record.photo or (record.customer_id != request.user.pk and request.role != TRAINER):
+        raise Http404('No such photo')
+
+    if size and record.photo_processed:
+        name = images.variant_name(record.pk, size, ext)
+    else:
+        name = record.photo.name  # a page rendered before processing finished
+    cache_control = PROCESSED_PHOTO_CACHE_CONTROL if record.photo_processed else 'private, no-cache'
+    response = media.serve_media(request, name, cache_control)
+    if response is None:
+        raise Http404('No such photo')
+    return response
 
+
+@login_required
+@trainer_required
+def trainer_dashboard(request):
     customers = User.objects.filter(groups__name='Customer').order_by('first_name').distinct()
-    recent_customers = customers[:6]
+    recent_customers = customers.select_related('customer_profile')[:6]
     total_customers = customers.count()
     total_diet_plans = DietPlan.objects.filter(trainer=request.user).count()
     total_workout_plans = WorkoutPlan.objects.filter(trainer=request.user).count()
@@ -97,36 +169,87 @@ def trainer_dashboard(request):
 
 
 @login_required
+@trainer_required
 def trainer_customers_list(request):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
-
     search_query = request.GET.get('search', '')
-    customers = User.objects.filter(groups__name='Customer').order_by('first_name').distinct()
-
+    bmi_filter = request.GET.get('bmi', '')
+    members = User.objects.filter(groups__name='Customer')
+    if bmi_filter in dict(BMI_CATEGORY_CHOICES):
+        members = members.filter(customer_profile__bmi_category=bmi_filter)
+    else:
+        bmi_filter = ''
+    # A user is in the Customer group at most once, so the group join cannot
+    # duplicate rows and the plan count can be aggregated in the same query.
+    customers = members.select_related('customer_profile').annotate(
+        diet_plan_count=Count('diet_plans', distinct=True)
+    )
+
+    results = None
     if search_query:
-        customers = customers.filter(
-            Q(username__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
+        results = search.search_customers(customers, search_query, limit=SEARCH_RESULTS_LIMIT, members=members)
+        if results is None:
+            customers = customers.filter(
+                Q(username__icontains=search_query) |
+                Q(first_name__icontains=search_query) |
+                Q(last_name__icontains=search_query)
+            )
+
+    if results is not None:
+        # Relevance-ranked matches are shown as a single page
+        page = KeysetPage(results)
+    else:
+        page = keyset_paginate(
+            customers, ('first_name', 'id'), CUSTOMERS_PAGE_SIZE,
+            after=request.GET.get('after'), before=request.GET.get('before'),
         )
 
     return render(request, 'gym/trainer_customers_list.html', {
-        'customers': customers,
-        'search_query': search_query
+        'customers': page,
+        'page': page,
+        'search_query': search_query,
+        'bmi_filter': bmi_filter,
+        'bmi_categories': BMI_CATEGORY_CHOICES,
     })
 
 
 @login_required
-def trainer_customer_detail(request, user_id):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
+@trainer_required
+def trainer_customer_autocomplete(request):
+    query = request.GET.get('q', '')
+    customers = User.objects.filter(groups__name='Customer').only('id', 'username', 'first_name', 'last_name')
+    matches = search.search_customers(customers, query, limit=AUTOCOMPLETE_LIMIT)
+    if matches is None and query:
+        matches = customers.filter(
+            Q(username__istartswith=query) | Q(first_name__istartswith=query) | Q(last_name__istartswith=query)
+        ).order_by('first_name', 'id')[:AUTOCOMPLETE_LIMIT]
+
+    return JsonResponse({'results': [
+        {'id': customer.id, 'username': customer.username, 'name': customer.get_full_name()}
+        for customer in matches or []
+    ]})
+
+
+@login_required
+@trainer_required
+def trainer_off_track_customers(request):
+    scores = analytics.score_customers(Q(customer__groups__name='Customer'))[:OFF_TRACK_LIMIT]
+    users = User.objects.select_related('customer_profile').in_bulk([score['customer_id'] for score in scores])
+    rows = [dict(score, customer=users[score['customer_id']]) for score in scores if score['customer_id'] in users]
+    return render(request, 'gym/trainer_off_track.html', {
+        'rows': rows,
+        'window_days': analytics.TREND_WINDOW_DAYS,
+    })
+
 
+@login_required
+@trainer_required
+def trainer_customer_detail(request, user_id):
     customer = get_object_or_404(User, id=user_id, groups__name='Customer')
     profile = customer.customer_profile
     diet_plans = customer.diet_plans.all()
     workout_plans = customer.workout_plans.all()
     progress_records = customer.progress_records.all()[:10]
+    trend = analytics.customer_trend(customer)
 
     context = {
         'customer': customer,
@@ -134,15 +257,51 @@ def trainer_customer_detail(request, user_id):
         'diet_plans': diet_plans,
         'workout_plans': workout_plans,
         'progress_records': progress_records,
+        'trend': trend,
+        **fragments.plan_context(customer.pk),
     }
     return render(request, 'gym/trainer_customer_detail.html', context)
 
 
 @login_required
-def trainer_create_diet_plan(request, user_id):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
+@trainer_required
+async def trainer_customer_detail_async(request, user_id):
+    customer = await User.objects.select_related('customer_profile').filter(
+        id=user_id, groups__name='Customer'
+    ).afirst()
+    if customer is None:
+        raise Http404('No customer matches the given query.')
+    plan_context = await sync_to_async(fragments.plan_context)(customer.pk)
+    diet_plans = customer.diet_plans.all()
+    workout_plans = customer.workout_plans.all()
+    queries = [
+        lambda: list(customer.progress_records.all()[:10]),
+        lambda: analytics.customer_trend(customer),
+    ]
+    plans_cached = await sync_to_async(fragments.plan_cards_cached)(
+        fragments.TRAINER_PLAN_CARDS, customer.pk, plan_context['plans_version']
+    )
+    if not plans_cached:
+        queries += [lambda: list(diet_plans), lambda: list(workout_plans)]
+    progress_records, trend, *plan_lists = await run_concurrently(*queries)
+    if plan_lists:
+        diet_plans, workout_plans = plan_lists
+
+    context = {
+        'customer': customer,
+        'profile': customer.customer_profile,
+        'diet_plans': diet_plans,
+        'workout_plans': workout_plans,
+        'progress_records': progress_records,
+        'trend': trend,
+        **plan_context,
+    }
+    return await sync_to_async(render)(request, 'gym/trainer_customer_detail.html', context)
 
+
+@login_required
+@trainer_required
+def trainer_create_diet_plan(request, user_id):
     customer = get_object_or_404(User, id=user_id, groups__name='Customer')
     if request.method == 'POST':
         form = DietPlanForm(request.POST)
@@ -159,10 +318,8 @@ def trainer_create_diet_plan(request, user_id):
 
 
 @login_required
+@trainer_required
 def trainer_create_workout_plan(request, user_id):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
-
     customer = get_object_or_404(User, id=user_id, groups__name='Customer')
     if request.method == 'POST':
         form = WorkoutPlanForm(request.POST)
@@ -179,34 +336,117 @@ def trainer_create_workout_plan(request, user_id):
 
 
 @login_required
-def trainer_edit_diet_plan(request, plan_id):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
+@trainer_required
+def trainer_import_progress(request, user_id):
+    customer = get_object_or_404(User, id=user_id, groups__name='Customer')
+    report = None
+    if request.method == 'POST':
+        form = ProgressImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                fmt = importers.detect_format(upload.name)
+                report = importers.import_progress(
+                    importers.read_records(importers.text_stream(upload.file), fmt), customer=customer
+                )
+            except importers.ProgressImportError as exc:
+                form.add_error('file', str(exc))
+            else:
+                messages.success(request, f'Import finished: {report}.')
+    else:
+        form = ProgressImportForm()
+    return render(request, 'gym/trainer_import_progress.html', {
+        'form': form, 'customer': customer, 'report': report
+    })
+
 
+@login_required
+@trainer_required
+def trainer_edit_diet_plan(request, plan_id):
     diet_plan = get_object_or_404(DietPlan, id=plan_id, trainer=request.user)
     if request.method == 'POST':
         form = DietPlanForm(request.POST, instance=diet_plan)
         if form.is_valid():
             form.save()
             messages.success(request, 'Diet plan updated successfully!')
-            return redirect('trainer_customer_detail', user_id=diet_plan.customer.id)
+            return redirect('trainer_customer_detail', user_id=diet_plan.customer_id)
     else:
         form = DietPlanForm(instance=diet_plan)
     return render(request, 'gym/trainer_edit_diet_plan.html', {'form': form, 'diet_plan': diet_plan})
 
 
 @login_required
+@trainer_required
 def trainer_edit_workout_plan(request, plan_id):
-    if not request.user.groups.filter(name='Trainer').exists():
-        return redirect('customer_dashboard')
-
     workout_plan = get_object_or_404(WorkoutPlan, id=plan_id, trainer=request.user)
     if request.method == 'POST':
         form = WorkoutPlanForm(request.POST, instance=workout_plan)
         if form.is_valid():
             form.save()
             messages.success(request, 'Workout plan updated successfully!')
-            return redirect('trainer_customer_detail', user_id=workout_plan.customer.id)
+            return redirect('trainer_customer_detail', user_id=workout_plan.customer_id)
     else:
         form = WorkoutPlanForm(instance=workout_plan)
     return render(request, 'gym/trainer_edit_workout_plan.html', {'form': form, 'workout_plan': workout_plan})
+
+
+@login_required
+@trainer_required
+def trainer_bulk_assign_plan(request, plan_type):
+    plan_model = PLAN_MODELS.get(plan_type)
+    if plan_model is None:
+        return redirect('trainer_dashboard')
+
+    customer_query = request.GET.get('q', '').strip()
+    form = BulkPlanAssignForm(request.POST or None, plan_model=plan_model, trainer=request.user,
+                              customer_query=customer_query, initial={'source_plan': request.GET.get('plan')})
+    if request.method == 'POST' and form.is_valid():
+        customer_ids = plans.customers_for_assignment(form.cleaned_data['customers'], form.cleaned_data['goal'])
+        created = plans.bulk_assign_plan(
+            form.cleaned_data['source_plan'], customer_ids, request.user,
+            deactivate_previous=form.cleaned_data['deactivate_previous'],
+        )
+        messages.success(request, f'{plan_type.title()} plan assigned to {len(created)} customers!')
+        return redirect('trainer_dashboard')
+    return render(request, 'gym/trainer_bulk_assign_plan.html', {
+        'form': form,
+        'plan_type': plan_type,
+        'customer_query': customer_query,
+        'customer_limit': BulkPlanAssignForm.CUSTOMER_CHOICES_LIMIT,
+    })
+
+
+@login_required
+def export_data(request, dataset):
+    if not (request.user.is_staff or request.role == TRAINER):
+        return redirect('customer_dashboard')
+    if dataset not in exports.DATASETS:
+        raise Http404('Unknown export')
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        fmt = 'csv'
+    filters = ExportFilterForm(request.GET)
+    if not filters.is_valid():
+        return HttpResponseBadRequest(filters.errors.as_text(), content_type='text/plain')
+    queryset = exports.export_queryset(
+        dataset,
+        start=filters.cleaned_data['start'],
+        end=filters.cleaned_data['end'],
+        trainer_id=filters.cleaned_data['trainer'],
+        customer_id=filters.cleaned_data['customer'],
+    )
+
+    content_type, extension = exports.FORMATS[fmt]
+    response = StreamingHttpResponse(exports.stream_export(dataset, fmt, queryset), content_type=content_type)
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def instrumentation_metrics(request):
+    return JsonResponse({
+        'views': instrumentation.registry.snapshot(),
+        'throttled': throttling.blocked_counts(),
+    })
@@ -1,6 +1,7 @@
 # gym_portal/gym_portal/settings.py
 from pathlib import Path
 import os
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -18,14 +19,20 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'gym',
+    'tasks',
 ]
 
 MIDDLEWARE = [
+    # Answers /static/ requests before anything else runs (off when DEBUG)
+    'gym.assets.StaticAssetMiddleware',
+    'gym.instrumentation.InstrumentationMiddleware',
+    'gym.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -34,7 +41,7 @@ ROOT_URLCONF = 'gym_portal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'gym.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # project-level templates folder[9]
         'APP_DIRS': True,
         'OPTIONS': {
@@ -49,14 +56,102 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'gym_portal.wsgi.application'
+# Keeps the file caches out of the checkout during tests
+TEST_RUNNER = 'gym_portal.test_runner.TestRunner'
 
+# Set by asgi.py: serve the async versions of the dashboard views
+ASYNC_VIEWS = os.environ.get('GYM_ASYNC_VIEWS') == '1'
+
+# Production SQLite profile. Connections are kept for CONN_MAX_AGE seconds
+# (checked before reuse), write transactions take the write lock up front
+# (transaction_mode) and wait up to `timeout` seconds for it instead of
+# failing with "database is locked". Per-connection pragmas (synchronous,
+# mmap and cache size) are applied by gym.database from SQLITE_PRAGMAS.
+# Tests run on a file rather than in memory, where SQLite's shared cache
+# reports lock contention as "table is locked" without waiting.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'gym_portal_test.sqlite3')},
     }
 }
 
+# Read replicas, e.g. GYM_DB_REPLICAS=/srv/gym/replica1.sqlite3,/srv/gym/replica2.sqlite3
+# Locally they are plain copies of the primary refreshed by
+# `manage.py sync_replicas`; DATABASE_PIN_SECONDS should cover the copy
+# interval so users read their own writes from the primary meanwhile.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('GYM_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = dict(DATABASES['default'], NAME=path.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['gym.routers.PrimaryReplicaRouter']
+DATABASE_PIN_SECONDS = 10
+
+# WAL lets readers carry on while a write commits and, with
+# synchronous=NORMAL, only syncs at checkpoints. The journal mode is stored
+# in the database file, so it is only set when asked for (GYM_SQLITE_JOURNAL_MODE=wal
+# in production); opening the development database then leaves it as committed.
+SQLITE_JOURNAL_MODE = os.environ.get('GYM_SQLITE_JOURNAL_MODE') or None
+SQLITE_PRAGMAS = {
+    'synchronous': 'normal',
+    'busy_timeout': 20000,  # ms, matches OPTIONS['timeout']
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # 32 MB
+    'temp_store': 'memory',
+}
+
+# The default cache holds role lookups (accounts.roles) and home-page
+# counters (gym.stats).
+# LocMemCache is per process, so multi-process deployments should point this
+# at a shared backend.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gym-portal',
+    },
+    # Session copies (see SESSION_ENGINE). Files are shared by every process
+    # on the host, which a logout must reach to evict the copy.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('GYM_SESSION_CACHE_DIR', BASE_DIR / 'cache' / 'sessions'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Login and signup attempt counts (see AUTH_THROTTLE_RATES), which every
+    # process must see for a limit to hold
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('GYM_THROTTLE_CACHE_DIR', BASE_DIR / 'cache' / 'throttle'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+# Memory is faster but per process, so only fit for a single-process server
+if os.environ.get('GYM_SESSION_CACHE') == 'locmem':
+    CACHES['sessions'].update(BACKEND='django.core.cache.backends.locmem.LocMemCache', LOCATION='gym-sessions')
+# The file cache increments by reading and rewriting a file, so a burst of
+# parallel attempts can get a few past a limit; a Redis server's increments
+# are atomic, and it also shares the counts between hosts
+if os.environ.get('GYM_THROTTLE_REDIS_URL'):
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['GYM_THROTTLE_REDIS_URL'],
+    }
+
+# Sessions are read from the cache and written through to django_session,
+# so authenticated requests don't query the table unless their copy was
+# evicted. Expired rows are deleted by the accounts.sessions task, which
+# `manage.py runworker` queues daily. Messages live in a signed cookie, so
+# showing one doesn't load or save the session either.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator', 'OPTIONS': {'min_length': 8}},
@@ -72,6 +167,12 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']  # project-level static
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed copies plus .br/.gz variants (brotli
+# only if the package is installed), served by gym.assets.StaticAssetMiddleware
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'gym.assets.CompressedManifestStaticFilesStorage'},
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -79,5 +180,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = 'dashboard'  # after login send to unified dashboard, we’ll route by role[6][2][9]
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
+# Sliding-window limits on login and signup POSTs (accounts.throttling), as
+# (attempts, seconds) per client IP and per username tried. The counts live
+# in the AUTH_THROTTLE_CACHE alias, shared by the processes on the host.
+# Behind a reverse proxy set GYM_TRUSTED_PROXIES to the number of proxies so
+# the client address is taken from X-Forwarded-For.
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': (30, 5 * 60), 'username': (10, 15 * 60)},
+    'signup': {'ip': (10, 60 * 60)},
+}
+AUTH_THROTTLE_CACHE = 'throttle'
+AUTH_THROTTLE_PROXIES = int(os.environ.get('GYM_TRUSTED_PROXIES', 0))
+# Background tasks (tasks app) are run by `manage.py runworker`. Set
+# GYM_TASKS_EAGER=1 to run them inline instead, e.g. when developing
+# without a worker. A task still marked running TASKS_LOCK_TIMEOUT seconds
+# after it was claimed is assumed lost and queued again.
+TASKS_ALWAYS_EAGER = os.environ.get('GYM_TASKS_EAGER') == '1'
+TASKS_LOCK_TIMEOUT = 600
+# Progress records older than this many days are reduced to weekly
+# summaries by `manage.py archive_progress` (see gym.archive); analytics and
+# exports read both. Keep it longer than the 90-day analytics window, and
+# don't raise it once records have been archived: readers assume nothing
+# within the horizon lives in the archive.
+PROGRESS_HOT_DAYS = int(os.environ.get('GYM_PROGRESS_HOT_DAYS', 365))
+
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+# Progress photos are served by gym.views.progress_photo after a permission
+# check. Set GYM_MEDIA_SENDFILE_HEADER to 'X-Accel-Redirect' (nginx, with an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or
+# 'X-Sendfile' (Apache, lighttpd) to let the web server send the bytes.
+MEDIA_SENDFILE_HEADER = os.environ.get('GYM_MEDIA_SENDFILE_HEADER') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Per-view budgets enforced by gym.instrumentation.InstrumentationMiddleware,
+# keyed by URL name. Going over logs a warning (and adds X-Budget-Exceeded
+# when INSTRUMENTATION_HEADERS is on); the test suites pin every view in
+# gym.urls and accounts.urls against VIEW_QUERY_BUDGETS.
+INSTRUMENTATION_HEADERS = DEBUG
+VIEW_TIME_BUDGET_DEFAULT_MS = 500
+VIEW_TIME_BUDGETS_MS = {
+    # Password hashing alone takes a few hundred milliseconds
+    'login': 1000,
+    'signup_customer': 1000,
+    'signup_trainer': 1000,
+    'export_data': 100,  # time to first byte; the stream itself is not timed
+}
+VIEW_QUERY_BUDGETS = {
+    'home': 3,
+    'signup_customer': 11,
+    'signup_trainer': 11,
+    'login': 9,
+    'logout': 4,
+    'dashboard': 3,
+    'customer_dashboard': 7,
+    'customer_profile_edit': 3,
+    'add_progress': 4,
+    'progress_photo': 4,
+    'trainer_dashboard': 7,
+    'trainer_customers_list': 5,
+    'trainer_customer_autocomplete': 4,
+    'trainer_off_track_customers': 5,
+    'trainer_customer_detail': 8,
+    'trainer_create_diet_plan': 3,
+    'trainer_create_workout_plan': 3,
+    'trainer_import_progress': 8,  # POST of up to IMPORT_BATCH_SIZE rows, some back-dated
+    'trainer_edit_diet_plan': 4,
+    'trainer_edit_workout_plan': 4,
+    'trainer_bulk_assign_plan': 9,  # POST with a goal and deactivate_previous
+    'export_data': 2,
+    'api_v1_profile': 4,
+    'api_v1_plans': 7,
+    'api_v1_progress': 5,
+    'instrumentation_metrics': 2,
+}
@@ -0,0 +1,34 @@
+# gym_portal/gym_portal/test_runner.py
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+class TestRunner(DiscoverRunner):
+    # Shared caches (the session and throttle files under cache/, or Redis)
+    # would collect test entries in the checkout or live state. Like the
+    # test database, tests get their own copy in a temporary directory,
+    # removed when the run ends.
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='gym_portal_test_cache_')
+        test_caches = {
+            alias: config if config['BACKEND'] == LOCMEM_CACHE else dict(
+                config, BACKEND='django.core.cache.backends.filebased.FileBasedCache',
+                LOCATION=os.path.join(self.cache_dir, alias),
+            )
+            for alias, config in settings.CACHES.items()
+        }
+        self.test_caches = override_settings(CACHES=test_caches)
+        self.test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_caches.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
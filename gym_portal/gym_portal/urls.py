@@ -1,8 +1,6 @@
 # gym_portal/gym_portal/urls.py
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 from gym.views import home
 
 urlpatterns = [
@@ -11,7 +9,3 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('gym/', include('gym.urls')),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
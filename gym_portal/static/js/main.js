@@ -18,6 +18,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Form validation feedback
     const forms = document.querySelectorAll('form');
     forms.forEach(form => {
+        // Downloads don't leave the page, so the buttons must stay usable
+        if (form.hasAttribute('data-download')) {
+            return;
+        }
         form.addEventListener('submit', function(e) {
             const submitBtn = form.querySelector('button[type="submit"]');
             if (submitBtn) {
@@ -54,4 +58,30 @@ document.addEventListener('DOMContentLoaded', function() {
     cards.forEach(card => {
         observer.observe(card);
     });
+
+    // Customer search suggestions
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(input => {
+        const datalist = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                return;
+            }
+            timer = setTimeout(() => {
+                fetch(input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query))
+                    .then(response => response.json())
+                    .then(data => {
+                        datalist.innerHTML = '';
+                        data.results.forEach(result => {
+                            const option = document.createElement('option');
+                            option.value = result.username;
+                            option.label = result.name;
+                            datalist.appendChild(option);
+                        });
+                    });
+            }, 200);
+        });
+    });
 });
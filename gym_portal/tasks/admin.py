@@ -0,0 +1,9 @@
+# gym_portal/tasks/admin.py
+from django.contrib import admin
+from .models import Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'last_error')
@@ -0,0 +1,7 @@
+# gym_portal/tasks/apps.py
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
@@ -0,0 +1,28 @@
+# gym_portal/tasks/management/commands/runworker.py
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks until stopped (SIGINT/SIGTERM finish the tasks in hand first).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Tasks run at once (default 4).')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Run tasks on threads, or on processes for CPU-bound work.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before looking again when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no due tasks are left.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        worker = Worker(options['concurrency'], options['pool'], options['poll_interval'])
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: worker.stop())
+        self.stdout.write(f'Worker {worker.worker_id} running {options["concurrency"]} {options["pool"]}(s)')
+        started = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after starting {started} task(s).'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='periodic',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('periodic', True), ('status__in', ['queued', 'running'])), fields=('name',), name='task_one_pending_periodic'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# gym_portal/tasks/models.py
+from django.db import models
+from django.utils import timezone
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FAILED = 'failed'
+STATUS_CHOICES = [
+    (QUEUED, 'Queued'),
+    (RUNNING, 'Running'),
+    (FAILED, 'Failed'),
+]
+
+
+class Task(models.Model):
+    # One queued call of a function registered with tasks.task. Rows are
+    # deleted once the call succeeds; failed ones stay for inspection.
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    # Queued by a worker for a task registered with `every`
+    periodic = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The claim query: due tasks, highest priority and oldest first
+            models.Index(fields=['-priority', 'run_at'], condition=models.Q(status=QUEUED),
+                         name='task_ready_idx'),
+            models.Index(fields=['locked_at'], condition=models.Q(status=RUNNING), name='task_running_idx'),
+        ]
+        constraints = [
+            # Workers starting together can't both queue the next periodic run
+            models.UniqueConstraint(fields=['name'], condition=models.Q(periodic=True, status__in=[QUEUED, RUNNING]),
+                                    name='task_one_pending_periodic'),
+        ]
+
+    def __str__(self):
+        return f"Task({self.name}) #{self.pk} {self.status}"
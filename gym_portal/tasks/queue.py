@@ -0,0 +1,77 @@
+# gym_portal/tasks/queue.py
+import json
+from datetime import timedelta
+from functools import update_wrapper
+from importlib import import_module
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, priority, every=None):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.every = every
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        # Calling the task runs it here and now, as before it was a task
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    # Queues a call for `runworker`. The row is written in the caller's
+    # transaction, so a worker only sees it once that commits. Arguments
+    # must be JSON-serializable. With TASKS_ALWAYS_EAGER the call runs
+    # inline instead and None is returned.
+    def enqueue(self, args=(), kwargs=None, countdown=0, priority=None):
+        args, kwargs = list(args), kwargs or {}
+        json.dumps([args, kwargs])  # fail in the caller, not in the worker
+        if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+            self.func(*args, **kwargs)
+            return None
+        return Task.objects.create(
+            name=self.name, args=args, kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+# Registers a function as a background task, usable bare (@task) or with
+# options (@task(max_attempts=5, priority=10)). The task is stored under
+# "<module>.<function name>" unless `name` is given. With `every` (seconds)
+# running workers also queue it on their own that long after its last run;
+# the module must be imported at startup for them to know of it.
+def task(func=None, name=None, max_attempts=3, priority=0, every=None):
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        task_function = TaskFunction(func, task_name, max_attempts, priority, every)
+        _registry[task_name] = task_function
+        return task_function
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    # A worker may not have imported the module that defines the task yet
+    if name not in _registry:
+        try:
+            import_module(name.rpartition('.')[0])
+        except ImportError:
+            pass
+    return _registry.get(name)
+
+
+def periodic_tasks():
+    return [function for function in _registry.values() if function.every]
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import FAILED, QUEUED, RUNNING, Task
+from .queue import periodic_tasks, task
+from .worker import Worker, claim, execute, queue_periodic, release_stale, schedule_periodic
+
+calls = []
+
+
+@task
+def record_call(value):
+    calls.append(value)
+
+
+@task
+def write_connection_id(path):
+    # Run in a pool process, so the test reads the result back from a file.
+    # A forked child shares its parent's addresses, so an inherited
+    # connection would have the parent's id.
+    connection.ensure_connection()
+    with open(path, 'w') as fh:
+        fh.write(f'{os.getpid()} {id(connection.connection)}')
+
+
+@task(max_attempts=2)
+def always_fails():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs_it(self):
+        queued = record_call.delay('hello')
+        self.assertEqual((queued.name, queued.args, queued.status), ('tasks.tests.record_call', ['hello'], QUEUED))
+        self.assertEqual(calls, [])
+
+        self.assertEqual(claim('test-worker', 5), [queued.pk])
+        self.assertEqual(claim('other-worker', 5), [])  # already taken
+        execute(queued.pk)
+        self.assertEqual(calls, ['hello'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failures_back_off_then_fail(self):
+        queued = always_fails.delay()
+        claim('test-worker', 1)
+        with self.assertLogs('tasks.worker', 'ERROR'):
+            execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (QUEUED, 1))
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertEqual(claim('test-worker', 1), [])  # not due yet
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        claim('test-worker', 1)
+        with self.assertLogs('tasks.worker', 'ERROR'):
+            execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, FAILED)
+        self.assertIn('RuntimeError: boom', queued.last_error)
+
+    def test_lost_tasks_are_requeued(self):
+        queued = record_call.delay('again')
+        claim('dead-worker', 1)
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(release_stale(), 1)
+        self.assertEqual(Task.objects.get(pk=queued.pk).status, QUEUED)
+
+    def test_arguments_must_be_json(self):
+        with self.assertRaises(TypeError):
+            record_call.delay(object())
+
+    def test_periodic_tasks_are_queued_once(self):
+        self.assertIn('accounts.sessions.clear_expired_sessions', [function.name for function in periodic_tasks()])
+        self.assertEqual(schedule_periodic(), len(periodic_tasks()))
+        self.assertEqual(schedule_periodic(), 0)
+        self.assertFalse(Task.objects.filter(run_at__lte=timezone.now()).exists())  # not due yet
+
+    def test_second_worker_cannot_queue_a_pending_periodic_task(self):
+        function = periodic_tasks()[0]
+        # As if another worker read "nothing pending" at the same moment
+        self.assertTrue(queue_periodic(function))
+        self.assertFalse(queue_periodic(function))
+        Task.objects.filter(name=function.name).update(status=FAILED)
+        self.assertTrue(queue_periodic(function))
+        function.delay()  # explicit calls aren't limited
+        self.assertEqual(Task.objects.filter(name=function.name, status=QUEUED).count(), 2)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode_schedules_nothing(self):
+        with mock.patch.object(periodic_tasks()[0], 'func') as func:
+            self.assertEqual(schedule_periodic(), 0)
+        func.assert_not_called()
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(record_call.delay('now'))
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+
+class WorkerTests(TransactionTestCase):
+
+    def test_burst_run_drains_the_queue(self):
+        calls.clear()
+        for value in range(6):
+            record_call.delay(value)
+        self.assertEqual(Worker(concurrency=3, poll_interval=0.05).run(burst=True), 6)
+        self.assertEqual(sorted(calls), list(range(6)))
+        self.assertFalse(Task.objects.filter(status__in=[QUEUED, RUNNING]).exists())
+
+    def test_process_pool_children_use_their_own_connection(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        paths = [os.path.join(directory, f'{index}.pid') for index in range(3)]
+        for path in paths:
+            write_connection_id.delay(path)
+        connection.ensure_connection()
+        parent = (os.getpid(), id(connection.connection))
+        self.assertEqual(Worker(concurrency=2, pool='process', poll_interval=0.05).run(burst=True), 3)
+        for path in paths:
+            with open(path) as fh:
+                pid, connection_id = map(int, fh.read().split())
+            self.assertNotEqual(pid, parent[0])
+            self.assertNotEqual(connection_id, parent[1])
+        # The children's writes went through; the parent's connection still works
+        self.assertFalse(Task.objects.exists())
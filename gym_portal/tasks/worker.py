@@ -0,0 +1,199 @@
+# gym_portal/tasks/worker.py
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FAILED, QUEUED, RUNNING, Task
+from .queue import get_task, periodic_tasks
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+STALE_CHECK_SECONDS = 60
+
+
+def backoff_seconds(attempts):
+    # Exponential with jitter, so tasks that failed together don't retry together
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 600))
+
+
+# Marks up to `limit` due tasks as running under `worker_id` and returns
+# their ids. Where the database has row locks that can be skipped
+# (PostgreSQL, MySQL 8) one locked SELECT picks them; SQLite claims each
+# candidate with a conditional UPDATE instead, and a row another worker
+# took first simply updates nothing and is passed over.
+def claim(worker_id, limit):
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    due = Task.objects.filter(status=QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    running = {'status': RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Task.objects.filter(pk__in=ids).update(**running)
+        return ids
+
+    claimed = []
+    for task_id in due.values_list('id', flat=True)[:limit * 2]:
+        if Task.objects.filter(pk=task_id, status=QUEUED).update(**running):
+            claimed.append(task_id)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+# Puts back tasks still marked running TASKS_LOCK_TIMEOUT after they were
+# claimed, as their worker most likely died, or fails them if that was
+# their last attempt.
+def release_stale():
+    stale = Task.objects.filter(status=RUNNING, locked_at__lt=timezone.now() - lock_timeout())
+    unlocked = {'locked_by': '', 'locked_at': None}
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=FAILED, last_error='Worker stopped before the task finished.', **unlocked
+    )
+    requeued = stale.update(status=QUEUED, **unlocked)
+    return requeued + failed
+
+
+# Queues the next run of a periodic task, `every` seconds out, unless one
+# is already pending; the unique constraint on pending periodic rows makes
+# this hold when several workers try at once.
+def queue_periodic(function):
+    try:
+        with transaction.atomic():
+            Task.objects.create(
+                name=function.name, priority=function.priority, max_attempts=function.max_attempts,
+                run_at=timezone.now() + timedelta(seconds=function.every), periodic=True,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+# Queues each periodic task that has no run pending. Eager mode would run
+# them inline on every check, whatever their interval, so it queues none.
+def schedule_periodic():
+    functions = periodic_tasks()
+    if not functions or getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        return 0
+    # Read first, so the usual case costs one query rather than a failed insert per task
+    pending = set(Task.objects.filter(
+        name__in=[function.name for function in functions], periodic=True, status__in=[QUEUED, RUNNING],
+    ).values_list('name', flat=True))
+    return sum(queue_periodic(function) for function in functions if function.name not in pending)
+
+
+def execute(task_id):
+    task = Task.objects.filter(pk=task_id, status=RUNNING).first()
+    if task is None:
+        return
+    try:
+        function = get_task(task.name)
+        if function is None:
+            raise LookupError(f'No task registered as "{task.name}"')
+        function(*task.args, **task.kwargs)
+    except Exception:
+        logger.exception('Task %s #%s failed (attempt %d of %d)', task.name, task.pk, task.attempts,
+                         task.max_attempts)
+        retry = task.attempts < task.max_attempts
+        Task.objects.filter(pk=task.pk).update(
+            status=QUEUED if retry else FAILED,
+            run_at=timezone.now() + timedelta(seconds=backoff_seconds(task.attempts) if retry else 0),
+            last_error=traceback.format_exc(), locked_by='', locked_at=None,
+        )
+    else:
+        Task.objects.filter(pk=task.pk).delete()
+
+
+def _run(task_id):
+    # Pool threads and processes keep their own connections between tasks
+    try:
+        execute(task_id)
+    finally:
+        close_old_connections()
+
+
+# Connections a forked pool process inherited from its parent, held so that
+# garbage collection never closes them: for a network database that would
+# end the session the parent is still using
+_inherited_connections = []
+
+
+def _init_process():
+    # The pool forks its children on first use, after the worker has already
+    # queried, so they inherit its open connections; the child opens its own
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+    # Forked children inherit a configured Django; spawned ones do not
+    django.setup()
+
+
+class Worker:
+    # Claims due tasks and runs them on a pool of `concurrency` threads, or
+    # processes with pool='process' (for CPU-bound tasks such as image
+    # processing, which would otherwise share one core through the GIL).
+    def __init__(self, concurrency=4, pool='thread', poll_interval=1.0):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _executor(self):
+        if self.pool == 'process':
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_process)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='task-worker')
+
+    # Runs until stop() is called or, with burst=True, until the queue has
+    # no due tasks left. Returns the number of tasks started.
+    def run(self, burst=False):
+        started = 0
+        running = set()
+        next_stale_check = 0
+        with self._executor() as executor:
+            while not self._stopping.is_set():
+                if timezone.now().timestamp() >= next_stale_check:
+                    release_stale()
+                    if not burst:  # a burst run wouldn't be around to run them
+                        schedule_periodic()
+                    next_stale_check = timezone.now().timestamp() + STALE_CHECK_SECONDS
+
+                for task_id in claim(self.worker_id, self.concurrency - len(running)):
+                    running.add(executor.submit(_run, task_id))
+                    started += 1
+                if burst and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.exception() is not None:
+                            logger.error('Task worker crashed', exc_info=future.exception())
+                else:
+                    self._stopping.wait(self.poll_interval)
+            wait(running)
+        close_old_connections()
+        return started